@@ -1,17 +1,47 @@
 import os
+import queue
+import shutil
+import threading
 import time
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from dotenv import load_dotenv
 
+from DSD.registry import get_dsd_registry
+from instrumentation import traced
 
-def setup_driver(download_dir):
+load_dotenv()
+# "selenium" drives the Expresso UI, "http" calls the DSD export endpoint directly (see DSD/http_download.py)
+DSD_DOWNLOADER = os.getenv("DSD_DOWNLOADER", "selenium").strip().lower()
+
+EXPRESSO_HOME = "https://expresso.colombiaonline.com/expresso/home.htm"
+
+# Expresso has served DSD reports as both .xls and .xlsx
+DSD_EXTENSIONS = (".xls", ".xlsx", ".csv")
+# Chrome writes in-progress downloads under these names and renames them when complete
+PARTIAL_DOWNLOAD_EXTENSIONS = (".crdownload", ".tmp")
+POLL_INTERVAL = 0.1
+# Expresso login, only ever read from the environment / .env
+EXPRESSO_USERNAME = os.getenv("EXPRESSO_USERNAME")
+EXPRESSO_PASSWORD = os.getenv("EXPRESSO_PASSWORD")
+
+
+def require_credentials(username, password):
+    if not username or not password:
+        raise ValueError("EXPRESSO_USERNAME and EXPRESSO_PASSWORD must be set to log in to Expresso.")
+
+
+@traced("expresso.chrome_start")
+def setup_driver(download_dir, headless=False):
     os.makedirs(download_dir, exist_ok=True)
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
-    #options.add_argument("--headless=new")  # Run in headless mode (use "new" for Chrome 109+)
+    if headless:
+        options.add_argument("--headless=new")  # Run in headless mode (use "new" for Chrome 109+)
     options.add_argument("--disable-gpu")
     prefs = {
         "download.default_directory": download_dir,
@@ -22,27 +52,48 @@ def setup_driver(download_dir):
     options.add_experimental_option("prefs", prefs)
     return webdriver.Chrome(options=options)
 
+@traced("expresso.login")
 def login(driver, username, password):
-    driver.get("https://expresso.colombiaonline.com/expresso/home.htm")
+    require_credentials(username, password)
+    driver.get(EXPRESSO_HOME)
     WebDriverWait(driver, 100).until(EC.presence_of_element_located((By.ID, "username"))).send_keys(username)
     driver.find_element(By.ID, "password").send_keys(password)
     driver.find_element(By.ID, "loginBtn").click()
 
+@traced("expresso.search_order")
 def search_expresso_id(driver, expresso_id):
+    """Open the order `expresso_id` from the RO search box. Returns False when Expresso has no such order."""
     WebDriverWait(driver, 100).until(EC.element_to_be_clickable((By.ID, "select2-headerRoId-container"))).click()
     search_expresso = WebDriverWait(driver, 100).until(EC.presence_of_element_located((By.CLASS_NAME, "select2-search__field")))
+    # Until select2's debounce fires, the rows shown before the search stay in the list
+    stale_rows = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
     search_expresso.send_keys(expresso_id)
-    time.sleep(3)
-    dropdown_options = WebDriverWait(driver, 100).until(EC.presence_of_all_elements_located((By.CLASS_NAME, "select2-results__option")))
-    if dropdown_options:
-        dropdown_options[-1].click()  # Select the last option
-    else:
-        print("No options found in dropdown.")
+    no_results = object()
 
+    def search_result(d):
+        if d.find_elements(By.CSS_SELECTOR, ".select2-results__option.loading-results"):
+            return False  # "Searching…"
+        for option in d.find_elements(By.CSS_SELECTOR, ".select2-results__option:not(.select2-results__message)"):
+            if expresso_id in option.text:
+                return option
+        # With no matching order select2 renders only a message row ("No results found")
+        if any(row not in stale_rows for row in d.find_elements(By.CSS_SELECTOR, ".select2-results__message")):
+            return no_results
+        return False
+
+    option = WebDriverWait(driver, 100, poll_frequency=POLL_INTERVAL).until(search_result)
+    if option is no_results:
+        print(f"No Expresso order matches {expresso_id}.")
+        return False
+    option.click()
+    return True
+
+@traced("expresso.open_order_tab")
 def switch_to_new_tab(driver):
     WebDriverWait(driver, 5).until(lambda d: len(driver.window_handles) > 1)
     driver.switch_to.window(driver.window_handles[-1])
 
+@traced("expresso.export_dsd")
 def find_and_download_file(driver, download_dir):
     WebDriverWait(driver, 10).until(
         EC.presence_of_all_elements_located((By.CSS_SELECTOR, "button.btn.t-btn-info"))
@@ -56,7 +107,6 @@ def find_and_download_file(driver, download_dir):
             if "DOWNLOAD DSD" in button.text.strip().upper():
                 driver.execute_script("arguments[0].click();", button)
                 print("Clicked 'Download DSD' button.")
-                time.sleep(2)  # Give some time for the download to start
                 return before_download  # ✅ Return the original set here
         except Exception as e:
             print("Failed to click download button:", e)
@@ -64,21 +114,41 @@ def find_and_download_file(driver, download_dir):
     print("No matching 'Download DSD' button found.")
     return before_download
 
+def completed_download(download_dir, before_download):
+    """
+    Return the path of a finished DSD that was not in `before_download`, or None while
+    nothing new has arrived or Chrome is still writing a partial file.
+    """
+    new_files = set(os.listdir(download_dir)) - before_download
+    if any(f.lower().endswith(PARTIAL_DOWNLOAD_EXTENSIONS) for f in new_files):
+        return None
+    for file in new_files:
+        if file.lower().endswith(DSD_EXTENSIONS):
+            return os.path.join(download_dir, file)
+    return None
+
+@traced("expresso.download_wait")
 def wait_for_download(download_dir, before_download, timeout=30):
-    start_time = time.time()
-    downloaded_file = None  
-    while time.time() - start_time < timeout:
-        after_download = set(os.listdir(download_dir))
-        new_files = after_download - before_download
-        for file in new_files:
-            if file.endswith(".xlsx"):
-                downloaded_file = os.path.join(download_dir, file)
-                return downloaded_file
-        time.sleep(1)
-    return downloaded_file
+    """Return the downloaded DSD path as soon as Chrome finishes writing it, or None after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        downloaded_file = completed_download(download_dir, before_download)
+        if downloaded_file or time.monotonic() >= deadline:
+            return downloaded_file
+        time.sleep(POLL_INTERVAL)
 
+def wait_for_first_text(driver, selectors, timeout=10):
+    """Wait until any of `selectors` matches an element with non-empty text and return that text."""
+    def first_text(d):
+        for selector in selectors:
+            for element in d.find_elements(By.CSS_SELECTOR, selector):
+                if element.text.strip():
+                    return element.text
+        return False
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(first_text)
+
+@traced("expresso.campaign_details")
 def fetch_campaign_details(driver):
-    time.sleep(2)
     order_name_selectors = [
         "#yoyoId > div.m-content.clearfix > div > div.m-portlet__body > div:nth-child(6) > div > div:nth-child(1) > div > div > div.caption > span.t-caption",
         "#yoyoId > div.m-content.clearfix > div > div.m-portlet__body > div:nth-child(5) > div > div:nth-child(1) > div > div > div.caption > span.t-caption"
@@ -87,49 +157,187 @@ def fetch_campaign_details(driver):
         "#yoyoId > div.m-content.clearfix > div > div.m-portlet__body > div:nth-child(6) > div > div:nth-child(3) > div > table > tbody > tr > td:nth-child(2) > div:nth-child(1) > span.uppercase.font-grey-mint.m--font-boldest",
         "#yoyoId > div.m-content.clearfix > div > div.m-portlet__body > div:nth-child(5) > div > div:nth-child(3) > div > table > tbody > tr > td:nth-child(2) > div:nth-child(1) > span.uppercase.font-grey-mint.m--font-boldest"
     ]
+    # The campaign card sits at either position depending on the order, wait for whichever renders
     order_name = None
-    for selector in order_name_selectors:
-        try:
-            order_name = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-            ).text
-            break
-        except TimeoutException:
-            continue
+    try:
+        order_name = wait_for_first_text(driver, order_name_selectors)
+    except TimeoutException:
+        pass
     if not order_name:
         raise Exception("Order name not found ")
     advertiser_name = None
-    for selector in advertiser_name_selectors:
-        try:
-            advertiser_name = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-            ).text
-            advertiser_name = advertiser_name.split('(')[0].strip()
-            break
-        except TimeoutException:
-            continue
+    try:
+        advertiser_name = wait_for_first_text(driver, advertiser_name_selectors).split('(')[0].strip()
+    except TimeoutException:
+        pass
     if not advertiser_name:
         raise Exception("Advertiser name not found using available selectors.")
     return order_name, advertiser_name
 
-def Dsd_Download(expresso_id):
+def download_order_dsd(driver, expresso_id, download_dir):
+    """Search an order on an already logged-in driver and download its DSD into download_dir."""
+    downloaded_file = None  # Initialize to None
+    if not search_expresso_id(driver, expresso_id):
+        return None, None, None
+    switch_to_new_tab(driver)
+    order_name,advertiser_name=fetch_campaign_details(driver)
+    before_download = find_and_download_file(driver, download_dir)
+    if before_download is not None:
+        downloaded_file = wait_for_download(download_dir, before_download)
+        if downloaded_file:
+            print("Downloaded Excel file:", downloaded_file)
+        else:
+            print("Download timed out or failed.")
+    return order_name,advertiser_name,downloaded_file
+
+
+class BrowserSession:
+    """A logged-in Chrome driver with its own hidden download staging folder."""
+
+    def __init__(self, index, download_dir, headless=True):
+        # Staging folders start with "." so half-downloaded files stay out of sight in downloads/
+        self.download_dir = os.path.join(download_dir, f".session-{index}")
+        self.driver = setup_driver(self.download_dir, headless=headless)
+        self.uses = 0
+        self.logged_in = False
+
+    @traced("expresso.session_check")
+    def ensure_logged_in(self):
+        """Open the Expresso home page and log in again only if the session has expired."""
+        self.driver.get(EXPRESSO_HOME)
+        if not self.logged_in or self.driver.find_elements(By.ID, "username"):
+            login(self.driver, EXPRESSO_USERNAME, EXPRESSO_PASSWORD)
+            self.logged_in = True
+
+    def reset_tabs(self):
+        """Close the order tabs opened by a download and go back to the first window."""
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+        shutil.rmtree(self.download_dir, ignore_errors=True)
+
+
+class BrowserSessionPool:
+    """
+    Keeps up to `size` logged-in headless Chrome sessions alive and hands one out per
+    DSD download. A session is recycled after `max_uses` downloads, or as soon as it fails.
+    Downloads are staged per session and moved into `download_dir` once complete, so
+    concurrent downloads never see each other's files.
+    """
+
+    def __init__(self, size=2, max_uses=25, download_dir="downloads", headless=True):
+        self.size = size
+        self.max_uses = max_uses
+        self.download_dir = os.path.abspath(download_dir)
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._sessions = set()
+
+    def _new_session(self):
+        with self._lock:
+            index = self._created
+            self._created += 1
+        session = BrowserSession(index, self.download_dir, headless=self.headless)
+        with self._lock:
+            self._sessions.add(session)
+        return session
+
+    def _discard(self, session):
+        session.quit()
+        with self._lock:
+            self._sessions.discard(session)
+
+    @contextmanager
+    def session(self):
+        """Borrow a logged-in session; blocks while all `size` sessions are in use."""
+        with self._slots:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = self._new_session()
+
+            try:
+                session.ensure_logged_in()
+                yield session
+                session.uses += 1
+                if session.uses < self.max_uses:
+                    session.reset_tabs()
+            except Exception:
+                # A failed download may leave the browser in any state, start afresh next time
+                self._discard(session)
+                raise
+
+            if session.uses >= self.max_uses:
+                self._discard(session)
+            else:
+                self._idle.put(session)
+
+    def download(self, expresso_id):
+        with self.session() as session:
+            order_name, advertiser_name, staged_file = download_order_dsd(
+                session.driver, expresso_id, session.download_dir
+            )
+            downloaded_file = None
+            if staged_file:
+                downloaded_file = os.path.join(self.download_dir, os.path.basename(staged_file))
+                if os.path.exists(downloaded_file):
+                    # Reports are named by timestamp, two sessions can finish in the same second
+                    downloaded_file = os.path.join(self.download_dir, f"{expresso_id}_{os.path.basename(staged_file)}")
+                shutil.move(staged_file, downloaded_file)
+        return order_name, advertiser_name, downloaded_file
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _download(expresso_id, pool=None):
+    if DSD_DOWNLOADER == "http":
+        from DSD.http_download import get_http_downloader
+        return get_http_downloader().download(expresso_id)
+
+    if pool is not None:
+        return pool.download(expresso_id)
+
     download_dir = os.path.abspath("downloads")
     driver = setup_driver(download_dir)
-    downloaded_file = None  # Initialize to None
 
     try:
-        login(driver, "anurag.mishra1@timesinternet.in", "Times@9899")
-        search_expresso_id(driver, expresso_id)
-        switch_to_new_tab(driver)
-        order_name,advertiser_name=fetch_campaign_details(driver)
-        before_download = find_and_download_file(driver, download_dir)
-        if before_download:
-            downloaded_file = wait_for_download(download_dir, before_download)
-            if downloaded_file:
-                print("Downloaded Excel file:", downloaded_file)
-            else:
-                print("Download timed out or failed.")
-        return order_name,advertiser_name,downloaded_file
+        login(driver, EXPRESSO_USERNAME, EXPRESSO_PASSWORD)
+        return download_order_dsd(driver, expresso_id, download_dir)
     finally:
         driver.quit()
 
+@traced("dsd.download")
+def Dsd_Download(expresso_id, pool=None):
+    """
+    Download the DSD of one Expresso order and return (order_name, advertiser_name, file_path).
+    With a `BrowserSessionPool` the download reuses a logged-in browser instead of
+    starting and logging in a new Chrome. With DSD_DOWNLOADER=http no browser is used at all.
+    The file is recorded in the DSD registry so readers get this order's exact report.
+    """
+    order_name, advertiser_name, downloaded_file = _download(expresso_id, pool=pool)
+    if downloaded_file:
+        get_dsd_registry().register(expresso_id, downloaded_file)
+    return order_name, advertiser_name, downloaded_file
+
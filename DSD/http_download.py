@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from DSD.download import EXPRESSO_USERNAME, EXPRESSO_PASSWORD, require_credentials
+from DSD.parser import read_any
+from instrumentation import traced
+
+load_dotenv()
+# Both URLs come from the portal's own login form / "Download DSD" request, e.g.
+#   EXPRESSO_LOGIN_URL=https://expresso.colombiaonline.com/expresso/login.htm
+#   EXPRESSO_DSD_EXPORT_URL=https://expresso.colombiaonline.com/expresso/dsd/export.htm?roId={ro_id}
+EXPRESSO_LOGIN_URL = os.getenv("EXPRESSO_LOGIN_URL")
+EXPRESSO_DSD_EXPORT_URL = os.getenv("EXPRESSO_DSD_EXPORT_URL")
+
+# A password field in an HTML answer means the portal sent its login form back
+LOGIN_FORM = re.compile(r'<input[^>]+type=["\']?password', re.IGNORECASE)
+
+SPREADSHEET_TYPES = {
+    "application/vnd.ms-excel": ".xls",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": ".xlsx",
+    "text/csv": ".csv",
+}
+
+
+class HttpDsdDownloader:
+    """
+    Downloads DSD reports straight from the Expresso export endpoint, no browser involved.
+
+    One pooled `requests.Session` logs in once and its cookies are reused for every
+    export. If the portal answers an export with HTML (its login page) the session has
+    expired, so it logs in again and retries once. A login that leaves no session cookie,
+    or that brings the login form back, raises instead of being treated as logged in.
+    """
+
+    def __init__(self, login_url=EXPRESSO_LOGIN_URL, export_url=EXPRESSO_DSD_EXPORT_URL,
+                 username=EXPRESSO_USERNAME, password=EXPRESSO_PASSWORD,
+                 download_dir="downloads", timeout=30, pool_size=8):
+        if not login_url or not export_url:
+            raise ValueError("EXPRESSO_LOGIN_URL and EXPRESSO_DSD_EXPORT_URL must be set to download DSDs over HTTP.")
+        self.login_url = login_url
+        self.export_url = export_url
+        self.username = username
+        self.password = password
+        self.download_dir = os.path.abspath(download_dir)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._login_lock = threading.Lock()
+        self._logged_in = False
+
+    @traced("expresso.http_login")
+    def login(self, force=False):
+        with self._login_lock:
+            if self._logged_in and not force:
+                return
+            require_credentials(self.username, self.password)
+            self._logged_in = False
+            response = self.session.post(
+                self.login_url,
+                data={"username": self.username, "password": self.password},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            if self._is_login_page(response) or not self.session.cookies:
+                raise RuntimeError(f"Expresso login failed for {self.username}: the portal did not start a session.")
+            self._logged_in = True
+
+    @traced("expresso.http_export")
+    def _export(self, expresso_id):
+        response = self.session.get(self.export_url.format(ro_id=expresso_id), timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _is_login_page(response):
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        return content_type == "text/html" and LOGIN_FORM.search(response.text) is not None
+
+    @staticmethod
+    def _is_report(response):
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        return content_type in SPREADSHEET_TYPES or "attachment" in response.headers.get("Content-Disposition", "")
+
+    def _file_name(self, response):
+        disposition = response.headers.get("Content-Disposition", "")
+        match = re.search(r'filename="?([^";]+)"?', disposition)
+        if match:
+            return os.path.basename(match.group(1))
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        ext = SPREADSHEET_TYPES.get(content_type, ".xls")
+        return f"DSD_REPORT_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}{ext}"
+
+    def download(self, expresso_id):
+        """Fetch one order's DSD. Returns (order_name, advertiser_name, file_path), like `Dsd_Download`."""
+        self.login()
+        response = self._export(expresso_id)
+        if not self._is_report(response):
+            # Expired cookies bring back the login page instead of the report
+            self.login(force=True)
+            response = self._export(expresso_id)
+            if not self._is_report(response):
+                print(f"Expresso did not return a DSD for {expresso_id}.")
+                return None, None, None
+
+        os.makedirs(self.download_dir, exist_ok=True)
+        downloaded_file = os.path.join(self.download_dir, f"{expresso_id}_{self._file_name(response)}")
+        # Written under a hidden name and renamed when complete, so find_report's {ro_id}_* lookup
+        # never matches a half-written report
+        partial_file = os.path.join(self.download_dir, "." + os.path.basename(downloaded_file) + ".part")
+        with open(partial_file, "wb") as f:
+            f.write(response.content)
+        os.replace(partial_file, downloaded_file)
+        print("Downloaded Excel file:", downloaded_file)
+
+        # Order and advertiser come from the report itself rather than from the portal page
+        df = read_any(downloaded_file).dropna(how="all")
+        order_name = str(df["Order Name"].iloc[0]) if "Order Name" in df.columns and len(df) else None
+        advertiser_name = str(df["Advertiser"].iloc[0]).split('(')[0].strip() if "Advertiser" in df.columns and len(df) else None
+        return order_name, advertiser_name, downloaded_file
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_http_downloader():
+    """Process-wide `HttpDsdDownloader`, so the login and its cookies are shared by every download."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = HttpDsdDownloader()
+        return _downloader
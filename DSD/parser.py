@@ -1,5 +1,19 @@
 import os
+import glob
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+from DSD.registry import file_sha256, get_dsd_registry
+from instrumentation import span, traced
+
+logger = logging.getLogger(__name__)
 
 def read_any(path: str):
     """Reads any Excel or CSV file and returns a pandas DataFrame."""
@@ -12,51 +26,268 @@ def read_any(path: str):
         return pd.read_excel(path, engine=None)
 
 
-def get_latest_file(folder: str):
-    """Get the most recently modified file in the given folder."""
-    files = [os.path.join(folder, f) for f in os.listdir(folder) if not f.startswith(".")]
-    if not files:
-        raise FileNotFoundError(f"No files found in folder: {folder}")
-    return max(files, key=os.path.getmtime)
+# Column holding the precomputed, normalized line item names of each row in a sidecar
+LINE_ITEM_KEYS_COLUMN = "__line_item_keys__"
+SIDECAR_SOURCE_HASH = b"dsd_source_sha256"
+# Object columns whose cells are not all strings, stored as text plus a per-cell type column
+SIDECAR_MIXED_COLUMNS = b"dsd_mixed_columns"
+VALUE_TYPES_PREFIX = "__value_types__:"
+# Arrow field names are strings; read_excel's column labels (an int or date header, say) are kept here
+SIDECAR_COLUMN_LABELS = b"dsd_column_labels"
+
+
+def sidecar_path(path: str) -> str:
+    """Arrow IPC sidecar next to a DSD file, hidden so it doesn't clutter downloads/ for people browsing it."""
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, f".{name}.arrow")
+
+
+def split_line_items(cell) -> List[str]:
+    """Comma-separated line item names in one column H cell, stripped, empty ones dropped."""
+    if pd.isna(cell):
+        return []
+    return [v.strip() for v in str(cell).split(",") if v.strip()]
+
 
+# (type name, Python type, text -> value) of the cell values read_excel puts in object columns,
+# most specific type first (bool before int, pd.Timestamp before datetime before date)
+CELL_TYPES = (
+    ("str", str, str),
+    ("bool", (bool, np.bool_), lambda text: text == "True"),
+    ("int", (int, np.integer), int),
+    ("float", (float, np.floating), float),
+    ("timestamp", pd.Timestamp, pd.Timestamp),
+    ("datetime", datetime, datetime.fromisoformat),
+    ("date", date, date.fromisoformat),
+    ("time", time, time.fromisoformat),
+)
+CELL_TYPE_CODES = {name: code for code, (name, _, _) in enumerate(CELL_TYPES)}
 
-def read_file(line_item_name: str, folder: str = "downloads"):
+
+def encode_cell(value) -> Tuple[str, int]:
+    """(text, type code) of one object column cell; unknown types are kept as their str()."""
+    for code, (name, types, _) in enumerate(CELL_TYPES):
+        if isinstance(value, types):
+            if name in ("str", "bool", "int"):
+                return str(value), code
+            return (repr(float(value)) if name == "float" else value.isoformat()), code
+    return str(value), CELL_TYPE_CODES["str"]
+
+
+def encode_mixed_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
     """
-    Load the latest Excel/CSV file and return only the row(s)
-    where the Line Item Name (column H) matches or contains `line_item_name`.
-    Supports multiple comma-separated line items in a single cell.
-    Returns a single dict if one match, else a list of dicts.
+    Make object columns Arrow-friendly without losing read_excel's cell types. Columns of
+    only strings are stored as they are. A column mixing types (a Rate column with a text
+    cell, say) becomes text plus a `__value_types__:<column>` column that `decode_mixed_columns`
+    uses to restore every cell's original type.
     """
-    path = get_latest_file(folder)
-    print(f"📄 Loading: {path}")
+    encoded = df.copy()
+    mixed = []
+    for column in df.columns[df.dtypes == object]:
+        values = df[column]
+        if all(isinstance(v, str) for v in values if not pd.isna(v)):
+            continue
+        cells = [(None, None) if pd.isna(v) else encode_cell(v) for v in values]
+        encoded[column] = pd.Series([text for text, _ in cells], index=df.index, dtype=object)
+        encoded[VALUE_TYPES_PREFIX + str(column)] = pd.array([code for _, code in cells], dtype="Int8")
+        mixed.append(str(column))
+    return encoded, mixed
 
-    df = read_any(path)
-    df = df.dropna(how="all")
 
-    # --- Handle column H as "Line Item Name" ---
-    if len(df.columns) >= 8:
-        col_h_name = df.columns[7]
-    else:
+def decode_mixed_columns(df: pd.DataFrame, mixed: List[str]) -> pd.DataFrame:
+    """Undo `encode_mixed_columns` on a frame read back from a sidecar."""
+    for column in mixed:
+        codes = df.pop(VALUE_TYPES_PREFIX + column)
+        df[column] = pd.Series([
+            np.nan if pd.isna(code) else CELL_TYPES[int(code)][2](text)
+            for text, code in zip(df[column], codes)
+        ], index=df.index, dtype=object)
+    return df
+
+
+def encode_column_labels(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[str, int]]]:
+    """`df` relabelled with the text of every column label, and the (text, type code) of each label."""
+    labels = [encode_cell(label) for label in df.columns]
+    return df.set_axis([text for text, _ in labels], axis=1), labels
+
+
+def decode_column_labels(df: pd.DataFrame, labels: List[Tuple[str, int]]) -> pd.DataFrame:
+    """Undo `encode_column_labels`."""
+    return df.set_axis([CELL_TYPES[code][2](text) for text, code in labels], axis=1)
+
+
+def write_sidecar(path: str, df: pd.DataFrame, line_item_keys: List[List[str]], source_hash: str):
+    df, labels = encode_column_labels(df)
+    df, mixed = encode_mixed_columns(df)
+    df[LINE_ITEM_KEYS_COLUMN] = line_item_keys
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SIDECAR_SOURCE_HASH: source_hash.encode(),
+        SIDECAR_MIXED_COLUMNS: json.dumps(mixed).encode(),
+        SIDECAR_COLUMN_LABELS: json.dumps(labels).encode(),
+    })
+    target = sidecar_path(path)
+    partial = target + ".part"
+    with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(partial, target)
+
+
+def read_sidecar(path: str, source_hash: str) -> Optional[Tuple[pd.DataFrame, List[List[str]]]]:
+    """Load the sidecar of `path`; None if it is missing or was built from different file contents."""
+    target = sidecar_path(path)
+    if not os.path.exists(target):
+        return None
+    try:
+        with pa.memory_map(target, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (pa.ArrowInvalid, OSError):
+        return None
+    metadata = table.schema.metadata or {}
+    if (metadata.get(SIDECAR_SOURCE_HASH, b"").decode() != source_hash
+            or SIDECAR_MIXED_COLUMNS not in metadata or SIDECAR_COLUMN_LABELS not in metadata):
+        return None
+
+    line_item_keys = table.column(LINE_ITEM_KEYS_COLUMN).to_pylist()
+    df = table.drop_columns([LINE_ITEM_KEYS_COLUMN]).to_pandas()
+    # Arrow hands back nulls in string columns as None, keep the NaN read_excel produces
+    object_columns = df.columns[df.dtypes == object]
+    df[object_columns] = df[object_columns].where(df[object_columns].notna(), np.nan)
+    df = decode_mixed_columns(df, json.loads(metadata[SIDECAR_MIXED_COLUMNS]))
+    return decode_column_labels(df, json.loads(metadata[SIDECAR_COLUMN_LABELS])), line_item_keys
+
+
+def read_report_frame(path: str) -> Tuple[pd.DataFrame, List[List[str]]]:
+    """
+    Return (DSD rows, normalized line item names per row) for a DSD file.
+
+    The spreadsheet is only parsed the first time; the result is stored in an Arrow
+    sidecar that later reads load instead, with every cell's read_excel type kept. The
+    sidecar is rebuilt whenever the source file's SHA-256 no longer matches the one it
+    was built from.
+    """
+    source_hash = file_sha256(path)
+    with span("dsd.read_sidecar"):
+        cached = read_sidecar(path, source_hash)
+    if cached is not None:
+        return cached
+
+    with span("dsd.parse_excel", path=os.path.basename(path)):
+        df = read_any(path).dropna(how="all").reset_index(drop=True)
+    if len(df.columns) < 8:
         raise ValueError("The file does not have a column H (8th column).")
+    line_item_keys = [[v.lower() for v in split_line_items(cell)] for cell in df[df.columns[7]]]
+    try:
+        write_sidecar(path, df, line_item_keys, source_hash)
+    except Exception:
+        # The sidecar only saves the next parse, the report itself was read fine
+        logger.warning("Could not write DSD sidecar for %s", path, exc_info=True)
+    return df, line_item_keys
+
+
+class DsdReport:
+    """
+    A DSD file parsed once, with an inverted index from every comma-separated
+    line item name in column H (stripped, lowercased) to the rows that list it.
+    `line_item_keys` are those names per row when already known (e.g. from a sidecar).
+    """
 
-    # --- Normalize target ---
-    target = line_item_name.strip().lower()
+    def __init__(self, path: str, df: pd.DataFrame, line_item_keys: List[List[str]] = None):
+        # --- Handle column H as "Line Item Name" ---
+        if len(df.columns) < 8:
+            raise ValueError("The file does not have a column H (8th column).")
+        self.path = path
+        self.df = df.reset_index(drop=True)
+        self.line_item_column = self.df.columns[7]
+        self.records = self.df.to_dict(orient="records")
 
-    # --- Match logic: supports comma-separated names ---
-    def match_line_item(cell):
-        if pd.isna(cell):
-            return False
-        values = [v.strip().lower() for v in str(cell).split(",") if v.strip()]
-        return target in values
+        self.index: Dict[str, List[int]] = {}
+        self.line_items: List[str] = []
+        for position, cell in enumerate(self.df[self.line_item_column]):
+            values = split_line_items(cell)
+            keys = line_item_keys[position] if line_item_keys is not None else [v.lower() for v in values]
+            for value, key in zip(values, keys):
+                rows = self.index.setdefault(key, [])
+                if not rows:
+                    self.line_items.append(value)
+                if position not in rows:
+                    rows.append(position)
+
+    def records_for(self, line_item_name: str) -> List[Dict]:
+        """Rows whose column H lists `line_item_name` (case-insensitive), as dicts."""
+        rows = self.index.get(line_item_name.strip().lower(), [])
+        # Copies, so callers can't alter the cached report
+        return [dict(self.records[row]) for row in rows]
+
+
+# Parsed reports keyed by absolute path, valid while (mtime, size) is unchanged
+REPORT_CACHE_SIZE = 32
+_report_cache: "OrderedDict[str, Tuple[Tuple[float, int], DsdReport]]" = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+
+def load_report(path: str) -> DsdReport:
+    """Parse a DSD file, or return the already parsed report if the file has not changed since."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime, stat.st_size)
+    with _report_cache_lock:
+        cached = _report_cache.get(path)
+        if cached and cached[0] == version:
+            _report_cache.move_to_end(path)
+            return cached[1]
+
+    print(f"📄 Loading: {path}")
+    report = DsdReport(path, *read_report_frame(path))
 
-    filtered = df[df[col_h_name].apply(match_line_item)]
+    with _report_cache_lock:
+        _report_cache[path] = (version, report)
+        _report_cache.move_to_end(path)
+        while len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return report
 
-    if filtered.empty:
+
+def find_report(line_item_name: str, folder: str = "downloads") -> str:
+    """
+    The DSD registered for the line item's Expresso order (its first 6 characters).
+
+    A report downloaded before the registry existed is only used if its file name starts
+    with the order's RO ID, as the HTTP downloader names them; it is registered then.
+    Another order's report is never picked.
+    """
+    ro_id = line_item_name.strip()[:6]
+    registry = get_dsd_registry()
+    entry = registry.latest(ro_id)
+    if entry:
+        return entry["path"]
+    order_files = glob.glob(os.path.join(glob.escape(folder), f"{glob.escape(ro_id)}_*"))
+    if not order_files:
+        raise FileNotFoundError(f"No DSD registered for order {ro_id}; download it first or pass its path.")
+    return registry.register(ro_id, max(order_files, key=os.path.getmtime))["path"]
+
+
+@traced("dsd.read_file")
+def read_file(line_item_name: str, folder: str = "downloads", path: str = None):
+    """
+    Load the given (or else the order's registered) Excel/CSV file and return only the row(s)
+    where the Line Item Name (column H) matches or contains `line_item_name`.
+    Supports multiple comma-separated line items in a single cell.
+    Returns a single dict if one match, else a list of dicts.
+    The file is parsed once and indexed; later calls against it are dict lookups.
+    """
+    path = path or find_report(line_item_name, folder)
+    records = load_report(path).records_for(line_item_name)
+
+    if not records:
         print(f"⚠️ No matching row found for: {line_item_name}")
         return {}
-    
-    records = filtered.to_dict(orient="records")
 
     # Return single dict if only one match
     return records[0] if len(records) == 1 else records
 
+
+def list_line_items(path: str):
+    """Return every line item name listed in column H of a DSD file, in file order."""
+    return list(load_report(path).line_items)
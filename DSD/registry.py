@@ -0,0 +1,86 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+# Kept in downloads/ so it travels with the reports it indexes; hidden so browsing the folder shows only reports
+DSD_REGISTRY_PATH = os.getenv("DSD_REGISTRY_PATH", os.path.join("downloads", ".dsd_registry.sqlite3"))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DsdRegistry:
+    """
+    SQLite index of downloaded DSD reports: Expresso RO ID -> file path, download time
+    and content hash. Every download is kept; lookups return the newest one for an order.
+    """
+
+    def __init__(self, path: str = DSD_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dsd_files (
+                ro_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                downloaded_at REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (ro_id, path)
+            );
+            CREATE INDEX IF NOT EXISTS dsd_files_latest ON dsd_files (ro_id, downloaded_at);
+            """
+        )
+
+    def register(self, ro_id: str, file_path: str) -> Dict:
+        """Record a freshly downloaded report for `ro_id` and return its entry."""
+        entry = {
+            "ro_id": str(ro_id),
+            "path": os.path.abspath(file_path),
+            "downloaded_at": time.time(),
+            "sha256": file_sha256(file_path),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dsd_files (ro_id, path, downloaded_at, sha256) VALUES (?, ?, ?, ?)",
+                (entry["ro_id"], entry["path"], entry["downloaded_at"], entry["sha256"]),
+            )
+        return entry
+
+    def latest(self, ro_id: str) -> Optional[Dict]:
+        """Newest registered report for `ro_id` that still exists on disk, or None."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ro_id, path, downloaded_at, sha256 FROM dsd_files WHERE ro_id = ? ORDER BY downloaded_at DESC",
+                (str(ro_id),),
+            ).fetchall()
+        for ro, path, downloaded_at, sha256 in rows:
+            if os.path.exists(path):
+                return {"ro_id": ro, "path": path, "downloaded_at": downloaded_at, "sha256": sha256}
+        return None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_dsd_registry() -> DsdRegistry:
+    """Process-wide registry at DSD_REGISTRY_PATH, opened on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DsdRegistry()
+        return _registry
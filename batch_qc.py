@@ -0,0 +1,190 @@
+"""
+Batch QC over a list of line item names and/or Expresso IDs.
+
+Entries are grouped by Expresso order so each DSD is downloaded once. As soon as an
+order's DSD is on disk its line items are fanned out to a bounded thread pool for the
+GAM fetch + comparison, while the next DSD downloads. A bare Expresso ID QCs every
+line item listed in that order's DSD.
+
+Usage:
+    python batch_qc.py orders.txt --workers 8 --output qc_results.json
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+import argparse
+import json
+import threading
+import time
+
+from DSD.download import BrowserSessionPool, Dsd_Download
+from DSD.parser import list_line_items
+from dsd_vs_expresso import qc_line_item
+import instrumentation
+
+DEFAULT_WORKERS = 8
+# Each pooled browser stages its downloads in its own folder, so downloads run
+# as concurrently as there are sessions.
+DEFAULT_BROWSER_SESSIONS = 2
+DEFAULT_SESSION_MAX_USES = 25
+
+
+def read_entries(path: str) -> List[str]:
+    """Read one line item name or Expresso ID per line, skipping blanks and # comments."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def group_by_order(entries: List[str]) -> Dict[str, List[str]]:
+    """
+    Group entries by Expresso ID (the first 6 characters of a line item name).
+    An order mapped to an empty list means "every line item in its DSD".
+    """
+    whole_orders = {entry for entry in entries if entry.isdigit()}
+    orders: Dict[str, List[str]] = {}
+    for entry in entries:
+        expresso_id = entry if entry.isdigit() else entry[:6]
+        names = orders.setdefault(expresso_id, [])
+        if expresso_id not in whole_orders and entry not in names:
+            names.append(entry)
+    return orders
+
+
+def download_order(expresso_id: str, pool: BrowserSessionPool = None) -> Dict:
+    start = time.perf_counter()
+    try:
+        order_name, advertiser_name, dsd_path = Dsd_Download(expresso_id, pool=pool)
+        error = None if dsd_path else "DSD download timed out or failed"
+    except Exception as e:
+        order_name = advertiser_name = dsd_path = None
+        error = f"DSD download failed: {e}"
+    return {
+        "expresso_id": expresso_id,
+        "order_name": order_name,
+        "advertiser": advertiser_name,
+        "dsd_file": dsd_path,
+        "error": error,
+        "download_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def qc_one(line_item_name: str, dsd_path: str) -> Dict:
+    start = time.perf_counter()
+    try:
+        with instrumentation.span("qc.line_item", line_item=line_item_name):
+            result, status = qc_line_item(line_item_name, dsd_path)
+    except Exception as e:
+        result, status = {"message": str(e)}, 500
+    return {
+        "line_item_name": line_item_name,
+        "status_code": status,
+        "result": result,
+        "qc_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def run_batch(entries: List[str], workers: int = DEFAULT_WORKERS,
+              browser_sessions: int = DEFAULT_BROWSER_SESSIONS,
+              session_max_uses: int = DEFAULT_SESSION_MAX_USES) -> Dict:
+    """
+    QC every entry and return the consolidated result:
+    {"summary": {...}, "orders": [{..., "line_items": [...]}, ...]}
+    """
+    run_start = time.perf_counter()
+    orders = group_by_order(entries)
+    order_results: Dict[str, Dict] = {}
+    qc_futures = {}
+    # Per-order wall time runs from submitting the download to the last of its line items
+    # finishing, so the wait for a download slot and in the QC pool's queue are included
+    submitted_at: Dict[str, float] = {}
+    finished_at: Dict[str, float] = {}
+    finished_lock = threading.Lock()
+
+    def track(future, expresso_id: str):
+        def mark_finished(_):
+            now = time.perf_counter()
+            with finished_lock:
+                finished_at[expresso_id] = max(finished_at.get(expresso_id, now), now)
+        future.add_done_callback(mark_finished)
+        return future
+
+    with BrowserSessionPool(size=browser_sessions, max_uses=session_max_uses) as browsers, \
+            ThreadPoolExecutor(max_workers=browser_sessions) as download_pool, \
+            ThreadPoolExecutor(max_workers=workers) as qc_pool:
+        download_futures = {}
+        for eid in orders:
+            submitted_at[eid] = time.perf_counter()
+            download_futures[track(download_pool.submit(download_order, eid, browsers), eid)] = eid
+
+        for future in as_completed(download_futures):
+            expresso_id = download_futures[future]
+            order = future.result()
+            order["line_items"] = []
+            order_results[expresso_id] = order
+            if order["error"]:
+                print(f"❌ {expresso_id}: {order['error']}")
+                continue
+
+            names = orders[expresso_id]
+            if not names:
+                try:
+                    names = list_line_items(order["dsd_file"])
+                except Exception as e:
+                    order["error"] = f"Unable to read DSD data: {e}"
+                    continue
+            for name in names:
+                qc_futures[track(qc_pool.submit(qc_one, name, order["dsd_file"]), expresso_id)] = expresso_id
+
+        for future in as_completed(qc_futures):
+            order_results[qc_futures[future]]["line_items"].append(future.result())
+
+    for expresso_id, order in order_results.items():
+        order["wall_time_s"] = round(finished_at[expresso_id] - submitted_at[expresso_id], 3)
+
+    elapsed = time.perf_counter() - run_start
+    line_item_count = sum(len(o["line_items"]) for o in order_results.values())
+    summary = {
+        "orders": len(order_results),
+        "failed_orders": sum(1 for o in order_results.values() if o["error"]),
+        "line_items": line_item_count,
+        "wall_time_s": round(elapsed, 3),
+        "orders_per_min": round(len(order_results) / elapsed * 60, 2) if elapsed else None,
+        "line_items_per_s": round(line_item_count / elapsed, 2) if elapsed else None,
+    }
+    return {"summary": summary, "orders": [order_results[eid] for eid in orders if eid in order_results]}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="QC many Expresso orders against GAM in one run.")
+    arg_parser.add_argument("entries", help="File with one line item name or Expresso ID per line")
+    arg_parser.add_argument("--output", default="qc_results.json", help="Consolidated JSON result file")
+    arg_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent GAM fetch/compare workers")
+    arg_parser.add_argument("--browser-sessions", type=int, default=DEFAULT_BROWSER_SESSIONS,
+                            help="Logged-in browsers kept alive for concurrent DSD downloads")
+    arg_parser.add_argument("--session-max-uses", type=int, default=DEFAULT_SESSION_MAX_USES,
+                            help="Downloads after which a browser is replaced")
+    arg_parser.add_argument("--metrics", default=instrumentation.QC_METRICS_PATH,
+                            help="JSON file for the run's stage timings and call counters")
+    arg_parser.add_argument("--prom-textfile", default=instrumentation.QC_PROM_TEXTFILE,
+                            help="Also write the run as a Prometheus textfile (node_exporter textfile collector)")
+    args = arg_parser.parse_args()
+
+    instrumentation.start_run("batch_qc")
+    results = run_batch(read_entries(args.entries), workers=args.workers,
+                        browser_sessions=args.browser_sessions, session_max_uses=args.session_max_uses)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    instrumentation.write_json(args.metrics)
+    if args.prom_textfile:
+        instrumentation.write_prometheus_textfile(args.prom_textfile)
+
+    for order in results["orders"]:
+        print(f"{order['expresso_id']}: {len(order['line_items'])} line items in {order['wall_time_s']}s"
+              + (f" ({order['error']})" if order["error"] else ""))
+    s = results["summary"]
+    print(f"\n✅ {s['orders']} orders / {s['line_items']} line items in {s['wall_time_s']}s "
+          f"({s['orders_per_min']} orders/min, {s['line_items_per_s']} line items/s) -> {args.output}")
+    print(instrumentation.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: helper_sheet.normalize_sheet against the original cell-by-cell filter_df
+normalization on a synthetic 10k-row placements sheet. No Google Sheets access needed.
+
+Usage:
+    python benchmarks/bench_filter_df.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper_sheet import normalize_sheet
+from sheet_rules import RuleEngine
+
+WEBSITES = [
+    "TOI Website", "TOI Mobile Site", "TOI MWEB", "TOI Android Apps", "TOI Android APP",
+    "TOI iOS App", "TOI iOS Apps", "TOI Amp sites", "ET website", "ET Mobile", "ET Android",
+    "NBT Amp site", "Maharashtra Times Website ", "IAG  iOS Apps", "VK mobile site",
+]
+AD_UNIT_TYPES = ["TIL_MREC PPD", "TIL_Billboard", "MWEB PPD", "Page Push Down", "TIL_Leaderboard", "Interstitial", "TIL_ATF"]
+PLACEMENTS = ["ATF", "BTF", "Mid Article", "MREC PPD 1", "Billboard ROS", "Page Push Down HP"]
+SECTIONS = [
+    "Homepage", "ROS (Excl PTG)", "Sports + Business", "ROS ( excl ptg )", "City (Excl PTG) + Entertainment",
+    "Website Home", "Cricket",
+]
+RATES = ["100", "250", "1,200", ""]
+
+
+def synthetic_sheet(rows: int, seed: int = 7) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Website": [rng.choice(WEBSITES) for _ in range(rows)],
+        "Ad Unit Type": [rng.choice(AD_UNIT_TYPES) for _ in range(rows)],
+        "Placement": [rng.choice(PLACEMENTS) for _ in range(rows)],
+        "Section": [rng.choice(SECTIONS) for _ in range(rows)],
+        "Rate": [rng.choice(RATES) for _ in range(rows)],
+    })
+
+
+def legacy_normalize(for_filter_df: pd.DataFrame) -> pd.DataFrame:
+    """The original filter_df body, minus the sheet fetch."""
+    for_filter_df = for_filter_df.applymap(
+        lambda x: re.sub(r'website', '', str(x), flags=re.IGNORECASE)
+    )
+    for_filter_df['Ad Unit Type'] = (
+        for_filter_df['Ad Unit Type']
+        .str.replace(r'^TIL_', '', regex=True)
+    )
+    for_filter_df['Section'] = (
+        for_filter_df['Section']
+        .str.replace(r'(?i)\(\s*Excl PTG\s*\)', '', regex=True)
+        .str.strip()
+    )
+    for_filter_df = for_filter_df.replace({r'(?i)\bMREC PPD\b': 'MREC'}, regex=True)
+    for_filter_df = for_filter_df.replace({r'(?i)\b(?:MWEB PPD|Page Push Down)\b': 'TOP_BANNER'}, regex=True)
+    for_filter_df = for_filter_df.replace({r'(?i)\bBillboard\b': 'Leaderboard'}, regex=True)
+
+    platform_map = {
+        r'(?i)\b(Mobile Site?|MWEB|Mobile)\b': 'MWEB',
+        r'(?i)\b(Android Apps?|Android APP|Android)\b': 'AOS',
+        r'(?i)\b(iOS Apps?|iOS App)\b': 'IOS',
+        r'(?i)\b(Amp site?|Amp sites?)\b': 'AMP'
+    }
+    for pattern, replacement in platform_map.items():
+        for_filter_df['Website'] = for_filter_df['Website'].str.replace(pattern, replacement, regex=True)
+
+    for_filter_df["platform"] = (
+        for_filter_df["Website"]
+        .str.extract(r'\b(AMP|MWEB|AOS|IOS)\b', expand=False)
+        .fillna("Web")
+    )
+    for_filter_df['Website'] = (
+        for_filter_df['Website']
+        .str.replace(r'\b(AMP|MWEB|AOS|IOS)\b', '', regex=True, case=False)
+        .str.replace(r'\s+', ' ', regex=True)
+    )
+    return for_filter_df
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark sheet normalization.")
+    arg_parser.add_argument("--rows", type=int, default=10000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    df = synthetic_sheet(args.rows)
+    with warnings.catch_warnings():
+        # DataFrame.applymap is deprecated in pandas 2.1+
+        warnings.simplefilter("ignore", FutureWarning)
+        legacy_s, expected = best_of(legacy_normalize, df, args.repeat)
+    engine = RuleEngine.from_yaml()
+
+    def cold_normalize(sheet_df):
+        # Time the engine with an empty memo cache, as on a fresh process
+        engine.cache_clear()
+        return normalize_sheet(sheet_df, engine)
+
+    new_s, actual = best_of(cold_normalize, df, args.repeat)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    print(f"rows:            {args.rows}")
+    print(f"legacy filter_df: {legacy_s * 1000:.1f} ms")
+    print(f"normalize_sheet:  {new_s * 1000:.1f} ms")
+    print(f"speedup:          {legacy_s / new_s:.1f}x (identical output)")
+    print(f"rules fired:      {engine.stats()['rules_fired']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: the HTTP DSD downloader (DSD/http_download.py) against a local stub of the
+Expresso portal. No Expresso access or browser needed.
+
+StubExpresso serves a login form, accepts one username/password (answering a wrong one
+with the login form again, as the portal does), and returns a DSD report from
+downloads/ as an attachment to sessions that logged in. `expire_sessions()` drops every
+session so the next export gets the login page. The run checks that a bad login raises,
+that an expired session logs in again once, and times a pull of `--orders` orders.
+
+Usage:
+    python benchmarks/bench_http_download.py [--orders 20]
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import contextlib
+import glob
+import io
+import os
+import secrets
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from DSD.http_download import HttpDsdDownloader
+
+USERNAME = "qc-bench@example.com"
+PASSWORD = "bench-password"
+LOGIN_FORM = (b'<html><form method="post" action="/login"><input name="username">'
+              b'<input name="password" type="password"><button id="loginBtn">Login</button></form></html>')
+
+
+class StubExpresso:
+    """Expresso login and DSD export endpoints on a random localhost port."""
+
+    def __init__(self, report_path):
+        with open(report_path, "rb") as f:
+            self.report = f.read()
+        self.sessions = set()
+        self.logins = 0
+        self.exports = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _session(self):
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == "JSESSIONID":
+                        return value
+                return None
+
+            def _send(self, body, content_type, headers=()):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                stub.logins += 1
+                if form.get("username") != [USERNAME] or form.get("password") != [PASSWORD]:
+                    return self._send(LOGIN_FORM, "text/html; charset=utf-8")
+                session = secrets.token_hex(8)
+                stub.sessions.add(session)
+                self._send(b"<html>home</html>", "text/html; charset=utf-8",
+                           [("Set-Cookie", f"JSESSIONID={session}; Path=/")])
+
+            def do_GET(self):
+                if self._session() not in stub.sessions:
+                    return self._send(LOGIN_FORM, "text/html; charset=utf-8")
+                stub.exports += 1
+                ro_id = parse_qs(urlparse(self.path).query)["roId"][0]
+                self._send(stub.report, "application/vnd.ms-excel",
+                           [("Content-Disposition", f'attachment; filename="DSD_REPORT_{ro_id}.xls"')])
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def expire_sessions(self):
+        self.sessions.clear()
+
+    def downloader(self, download_dir, username=USERNAME, password=PASSWORD):
+        return HttpDsdDownloader(
+            login_url=f"{self.base_url}/login", export_url=f"{self.base_url}/export?roId={{ro_id}}",
+            username=username, password=password, download_dir=download_dir,
+        )
+
+    def close(self):
+        self.server.shutdown()
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Time the HTTP DSD downloader against a stub Expresso.")
+    arg_parser.add_argument("--orders", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    stub = StubExpresso(sorted(glob.glob(os.path.join(REPO_DIR, "downloads", "DSD_REPORT_*.xls")))[0])
+    download_dir = tempfile.mkdtemp(prefix="qc-http-bench-")
+    try:
+        try:
+            stub.downloader(download_dir, password="wrong").login()
+            sys.exit("A rejected login was treated as logged in")
+        except RuntimeError as e:
+            print(f"Bad credentials: {e}")
+
+        downloader = stub.downloader(download_dir)
+        order_name, advertiser_name, path = quiet(downloader.download, "100000")
+        assert path and os.path.exists(path), "No DSD downloaded"
+        print(f"First order: {order_name} / {advertiser_name} -> {os.path.basename(path)}")
+
+        stub.expire_sessions()
+        logins = stub.logins
+        assert quiet(downloader.download, "100001")[2], "No DSD downloaded after the session expired"
+        assert stub.logins == logins + 1, "An expired session should log in again exactly once"
+        print("Expired session: logged in again and retried")
+
+        timings = []
+        for n in range(args.orders):
+            start = time.perf_counter()
+            quiet(downloader.download, str(200000 + n))
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{args.orders} orders: median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms per order "
+              f"({stub.logins} logins, {stub.exports} exports)")
+    finally:
+        stub.close()
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark: set-based dsd_vs_expresso.is_cpd against the original list-scanning comparison
+on RON line items that target thousands of placements. No GAM, DSD or database access needed.
+
+Usage:
+    python benchmarks/bench_is_cpd.py [--line-items 20] [--placements 3000] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsd_vs_expresso import is_cpd
+from line_item_details_in_gam import LineItemRecord
+from qc_checks import normalize_geo_list, normalize_list
+from utils import parse_date
+
+GEOS = ["India", "Mumbai", "Delhi", "Bengaluru", "Chennai", "Kolkata", "Pune", "Hyderabad", "Dubai", "Singapore"]
+
+
+def legacy_is_cpd(gam_data, dsd_data, placement_names):
+    """The original is_cpd body, with the sheet placements passed in."""
+    matched, unmatched = {}, {}
+    dsd_placements_list = normalize_list(placement_names)
+    for g in gam_data:
+        g_name = g.get("name", "Unknown Line Item")
+        gam_placements_list = normalize_list(g.get("targetedPlacement"))
+        checks = {
+            "cpd_daily_rate": (g.get("cpd_daily_rate"), dsd_data.get("Rate")),
+            "currency_code": (g.get("currency_code"), dsd_data.get("Currency")),
+            "start_date": (parse_date(g.get("start_date")), parse_date(dsd_data.get("PHB Booking Date"))),
+            "end_date": (parse_date(g.get("end_date")), parse_date(dsd_data.get("PHB Booking Date"))),
+            "start_time": (g.get("start_time"), "00:00:00"),
+            "end_time": (g.get("end_time"), "23:59:59"),
+        }
+        for field, (g_val, d_val) in checks.items():
+            if g_val == d_val:
+                matched[field] = {"gam": g_val, "dsd": d_val}
+            else:
+                unmatched.setdefault(field, {"gam": g_val, "dsd": d_val, "unmatch_line_item": []})
+                if g_name not in unmatched[field]["unmatch_line_item"]:
+                    unmatched[field]["unmatch_line_item"].append(g_name)
+
+        gam_missing = [v for v in gam_placements_list if v not in dsd_placements_list]
+        dsd_missing = [v for v in dsd_placements_list if v not in gam_placements_list]
+        if not gam_missing and not dsd_missing:
+            matched["targetedPlacement"] = {"gam": gam_placements_list, "dsd": dsd_placements_list}
+        else:
+            unmatched.setdefault(
+                "targetedPlacement",
+                {"gam_missing": gam_missing, "dsd_missing": dsd_missing, "unmatch_line_item": []},
+            )
+            if g_name not in unmatched["targetedPlacement"]["unmatch_line_item"]:
+                unmatched["targetedPlacement"]["unmatch_line_item"].append(g_name)
+
+        list_fields = [
+            ("included_geo", g.get("geo"), dsd_data.get("Geo_Target")),
+            ("excluded_geo", g.get("excluded_geo"), dsd_data.get("Geo_Exclusion")),
+        ]
+        for field_name, gam_val, dsd_val in list_fields:
+            gam_list = normalize_geo_list(gam_val)
+            dsd_list = normalize_geo_list(dsd_val)
+            gam_missing = [v for v in gam_list if v not in dsd_list]
+            dsd_missing = [v for v in dsd_list if v not in gam_list]
+            if not gam_missing and not dsd_missing:
+                matched[field_name] = {"gam": gam_list, "dsd": dsd_list}
+            else:
+                unmatched.setdefault(
+                    field_name,
+                    {"gam_missing": gam_missing, "dsd_missing": dsd_missing, "unmatch_line_item": []},
+                )
+                if g_name not in unmatched[field_name]["unmatch_line_item"]:
+                    unmatched[field_name]["unmatch_line_item"].append(g_name)
+
+    return {"matched_fields": matched, "unmatched_fields": unmatched}, 200
+
+
+def synthetic_ron(line_items: int, placements: int, seed: int = 11):
+    """RON line items: each targets (almost) every placement of a large sheet, some drift."""
+    rng = random.Random(seed)
+    sheet = [f"TOI_ROS_{i:05d}_ATF" for i in range(placements)]
+    gam_data = []
+    for n in range(line_items):
+        targeted = list(sheet)
+        rng.shuffle(targeted)
+        if n % 3:
+            # Drop a few sheet placements and add a few the sheet does not have
+            targeted = targeted[rng.randint(1, 25):] + [f"ET_ROS_{n}_{k}" for k in range(rng.randint(0, 5))]
+        gam_data.append({
+            "name": f"28635260DOMERAYMONTILBOTH{n}ATFCPDRON",
+            "cpd_daily_rate": 250000.0 if n % 4 else 200000.0,
+            "currency_code": "INR",
+            "start_date": "2025-04-01",
+            "end_date": "2025-04-01" if n % 5 else "2025-04-02",
+            "start_time": "00:00:00",
+            "end_time": "23:59:59",
+            "targetedPlacement": targeted,
+            "geo": rng.sample(GEOS, 6),
+            "excluded_geo": rng.sample(GEOS, 2) if n % 2 else [],
+        })
+    dsd_data = {
+        "Rate": 250000.0,
+        "Currency": "INR",
+        "PHB Booking Date": "2025-04-01",
+        "Geo_Target": ", ".join(GEOS[:6]),
+        "Geo_Exclusion": "",
+    }
+    return gam_data, dsd_data, sheet
+
+
+def as_records(gam_data):
+    """The detail dicts as the LineItemRecords the GAM fetch now returns."""
+    return [
+        LineItemRecord(**{k: tuple(v) if isinstance(v, list) else v for k, v in g.items()})
+        for g in gam_data
+    ]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the is_cpd comparison.")
+    arg_parser.add_argument("--line-items", type=int, default=20)
+    arg_parser.add_argument("--placements", type=int, default=3000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    gam_data, dsd_data, sheet = synthetic_ron(args.line_items, args.placements)
+    records = as_records(gam_data)
+    legacy_s, expected = best_of(lambda: legacy_is_cpd(gam_data, dsd_data, sheet), args.repeat)
+    new_s, actual = best_of(lambda: is_cpd(records, dsd_data, dsd_placements=sheet), args.repeat)
+
+    assert actual == expected, "is_cpd output differs from the original comparison"
+    print(f"line items x placements: {args.line_items} x {args.placements}")
+    print(f"legacy is_cpd:           {legacy_s * 1000:.1f} ms")
+    print(f"set-based is_cpd:        {new_s * 1000:.1f} ms")
+    print(f"speedup:                 {legacy_s / new_s:.1f}x (identical output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Offline stand-in for the googleads AdManagerClient, serving recorded GAM entities.
+
+The fixture (benchmarks/fixtures/gam_entities.json) holds serialized SOAP objects per
+table: line_items, ad_units, placements, custom_targeting_keys and custom_targeting_values.
+FakeGamClient evaluates the PQL statements the QC code sends (`id IN (...)`,
+`name LIKE :name`, `>= :since`, ORDER BY, LIMIT/OFFSET) against those tables and counts
+every call by (service, method), so N+1 lookups show up as call counts.
+
+Record a fresh fixture from the live network with:
+    python benchmarks/fake_gam.py record <line item name> [<line item name> ...]
+"""
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GAM_FIXTURE_PATH = os.path.join(FIXTURES_DIR, "gam_entities.json")
+
+# (service, method) -> fixture table
+STATEMENT_METHODS = {
+    ("LineItemService", "getLineItemsByStatement"): "line_items",
+    ("InventoryService", "getAdUnitsByStatement"): "ad_units",
+    ("PlacementService", "getPlacementsByStatement"): "placements",
+    ("CustomTargetingService", "getCustomTargetingKeysByStatement"): "custom_targeting_keys",
+    ("CustomTargetingService", "getCustomTargetingValuesByStatement"): "custom_targeting_values",
+}
+# PQL table -> fixture table
+PQL_TABLES = {"Ad_Unit": "ad_units", "Placement": "placements"}
+
+CONDITION = re.compile(r"^(\w+)\s*(IN|LIKE|>=|=)\s*(.+)$", re.IGNORECASE)
+STATEMENT = re.compile(
+    r"^(?:SELECT\s+(?P<columns>.+?)\s+FROM\s+(?P<table>\w+)\s*)?"
+    r"(?:WHERE\s+(?P<where>.+?)\s*)?"
+    r"(?:ORDER BY\s+(?P<order>\w+)(?:\s+(?:ASC|DESC))?\s*)?"
+    r"(?:LIMIT\s+(?P<limit>\d+)\s*)?"
+    r"(?:OFFSET\s+(?P<offset>\d+))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class SoapObject:
+    """Attribute and item access over a serialized SOAP object, like zeep's CompoundValue."""
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.__dict__.update(fields)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __contains__(self, name):
+        return name in self.__dict__
+
+    def __repr__(self):
+        return f"SoapObject({self.__dict__})"
+
+
+def to_soap(value):
+    if isinstance(value, dict):
+        return SoapObject({k: to_soap(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [to_soap(v) for v in value]
+    return value
+
+
+def _bind_values(statement: Dict) -> Dict[str, Any]:
+    return {v["key"]: v["value"]["value"] for v in statement.get("values") or []}
+
+
+def _column(entity: Dict, column: str):
+    """Entity field for a PQL column: `Id`/`id`, `LastModifiedDateTime`/`lastModifiedDateTime`, ..."""
+    return entity.get(column[0].lower() + column[1:])
+
+
+def _sortable(value):
+    """DateTime dicts compare by their fields; everything else as is."""
+    if isinstance(value, dict) and "date" in value:
+        date = value["date"]
+        return (date["year"], date["month"], date["day"], value["hour"], value["minute"], value["second"])
+    return value
+
+
+def _matches(entity: Dict, condition: str, binds: Dict[str, Any]) -> bool:
+    match = CONDITION.match(condition.strip())
+    if not match:
+        raise ValueError(f"Unsupported PQL condition: {condition}")
+    column, operator, operand = match.groups()
+    value = _column(entity, column)
+    operator = operator.upper()
+    if operator == "IN":
+        return str(value) in {v.strip() for v in operand.strip("()").split(",")}
+    bound = binds.get(operand[1:]) if operand.startswith(":") else operand.strip("'")
+    if operator == "LIKE":
+        pattern = re.escape(str(bound)).replace("%", ".*").replace("_", ".")
+        return re.fullmatch(pattern, str(value or ""), re.IGNORECASE | re.DOTALL) is not None
+    if operator == ">=":
+        return _sortable(value) >= _sortable(bound)
+    return str(value) == str(bound)
+
+
+def select(rows: List[Dict], statement: Dict) -> List[Dict]:
+    """Rows of a fixture table the statement selects, in the page it asks for."""
+    parsed = STATEMENT.match(statement["query"].strip())
+    if not parsed:
+        raise ValueError(f"Unsupported PQL statement: {statement['query']}")
+    binds = _bind_values(statement)
+    if parsed["where"]:
+        conditions = re.split(r"\s+AND\s+", parsed["where"], flags=re.IGNORECASE)
+        rows = [r for r in rows if all(_matches(r, c, binds) for c in conditions)]
+    if parsed["order"]:
+        rows = sorted(rows, key=lambda r: _sortable(_column(r, parsed["order"])))
+    offset = int(parsed["offset"] or 0)
+    limit = int(parsed["limit"] or 500)
+    return rows[offset:offset + limit]
+
+
+class FakeService:
+    def __init__(self, client: "FakeGamClient", name: str):
+        self._client = client
+        self._name = name
+
+    def __getattr__(self, method):
+        def call(statement):
+            self._client.calls[(self._name, method)] += 1
+            if (self._name, method) in STATEMENT_METHODS:
+                rows = select(self._client.tables[STATEMENT_METHODS[(self._name, method)]], statement)
+                return to_soap({"totalResultSetSize": len(rows), "startIndex": 0, "results": rows})
+            if (self._name, method) == ("PublisherQueryLanguageService", "select"):
+                return self._client.pql_select(statement)
+            raise NotImplementedError(f"{self._name}.{method} is not recorded")
+        return call
+
+
+class FakeGamClient:
+    """AdManagerClient look-alike: `GetService(name, version)` returns services backed by fixture tables."""
+
+    def __init__(self, tables: Dict[str, List[Dict]]):
+        self.tables = tables
+        self.calls = Counter()
+
+    @classmethod
+    def from_fixture(cls, path: str = GAM_FIXTURE_PATH) -> "FakeGamClient":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def GetService(self, service_name, version=None, server=None):
+        return FakeService(self, service_name)
+
+    def pql_select(self, statement: Dict):
+        parsed = STATEMENT.match(statement["query"].strip())
+        columns = [c.strip() for c in parsed["columns"].split(",")]
+        rows = select(self.tables[PQL_TABLES[parsed["table"]]], statement)
+        return to_soap({
+            "columnTypes": [{"labelName": c} for c in columns],
+            "rows": [{"values": [{"value": _column(r, c)} for c in columns]} for r in rows],
+        })
+
+    def call_counts(self) -> Dict[str, int]:
+        return {f"{service}.{method}": n for (service, method), n in sorted(self.calls.items())}
+
+
+def _serialize(response) -> List[Dict]:
+    from zeep.helpers import serialize_object
+    return json.loads(json.dumps(serialize_object(getattr(response, "results", None) or [], dict), default=str))
+
+
+def record(client, line_item_names: Iterable[str], path: str = GAM_FIXTURE_PATH):
+    """Record the line items matching `line_item_names` and every entity they reference."""
+    from line_item_details_in_gam import (
+        collect_page_refs, extract_line_item_details, id_statements, line_item_statement, value_statements,
+    )
+
+    tables = {table: [] for table in STATEMENT_METHODS.values()}
+    services = {}
+
+    def fetch(service_name, method, statement):
+        service = services.setdefault(service_name, client.GetService(service_name, version='v202411'))
+        return _serialize(getattr(service, method)(statement))
+
+    for line_item_name in line_item_names:
+        statement = line_item_statement(line_item_name)
+        while True:
+            page = fetch("LineItemService", "getLineItemsByStatement", statement.ToStatement())
+            tables["line_items"].extend(page)
+            if len(page) < statement.limit:
+                break
+            statement.offset += statement.limit
+
+    parsed = [extract_line_item_details(client, to_soap(item)) for item in tables["line_items"]]
+    ad_unit_ids, placement_ids, key_ids, value_pairs = collect_page_refs(parsed)
+    for service_name, method, statements in (
+        ("InventoryService", "getAdUnitsByStatement", id_statements(ad_unit_ids)),
+        ("PlacementService", "getPlacementsByStatement", id_statements(placement_ids)),
+        ("CustomTargetingService", "getCustomTargetingKeysByStatement", id_statements(key_ids)),
+        ("CustomTargetingService", "getCustomTargetingValuesByStatement", value_statements(list(dict.fromkeys(value_pairs)))),
+    ):
+        table = STATEMENT_METHODS[(service_name, method)]
+        for statement in statements:
+            tables[table].extend(
+                {k: entity.get(k) for k in ("id", "name", "customTargetingKeyId", "lastModifiedDateTime") if k in entity}
+                for entity in fetch(service_name, method, statement)
+            )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tables, f, separators=(",", ":"))
+    print(f"Recorded {', '.join(f'{len(rows)} {table}' for table, rows in tables.items())} to {path}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Record the GAM fixture for the offline benchmarks.")
+    arg_parser.add_argument("command", choices=["record"])
+    arg_parser.add_argument("line_item_names", nargs="+")
+    arg_parser.add_argument("--out", default=GAM_FIXTURE_PATH)
+    args = arg_parser.parse_args()
+
+    from line_item_details_in_gam import get_gam_client
+    record(get_gam_client(), args.line_item_names, args.out)
+
+
+if __name__ == "__main__":
+    main()
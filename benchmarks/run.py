@@ -0,0 +1,343 @@
+"""
+Offline benchmark suite for the QC pipeline.
+
+Runs read_file, filter_df, is_cpd, expand_daypart_windows/_to_dates, parse_date,
+get_line_items_details_by_name and the inventory mirror sync against recorded fixtures:
+scratch copies of the DSD reports in downloads/, the GAM entities in benchmarks/fixtures/gam_entities.json
+(served by fake_gam.FakeGamClient) and the placements sheet snapshot in
+benchmarks/fixtures/placements_sheet.json. No GAM, Sheets, Postgres or Expresso access needed.
+
+Every benchmark reports its timings and the GAM / Sheets calls one run made. With
+--compare, a benchmark that got slower than the tolerance or made more calls than the
+baseline is reported as a regression and the runner exits with status 1.
+
+Usage:
+    python benchmarks/run.py [--repeat 5] [--only NAME ...] [--save results.json] [--compare baseline.json]
+"""
+from typing import Any, Callable, Dict, List
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# The caches the pipeline keeps on disk go to a scratch directory, set before the modules read them
+SCRATCH_DIR = tempfile.mkdtemp(prefix="qc-bench-")
+os.environ["INVENTORY_MIRROR_PATH"] = os.path.join(SCRATCH_DIR, "inventory.sqlite3")
+os.environ["TARGETING_CACHE_PATH"] = os.path.join(SCRATCH_DIR, "targeting.sqlite3")
+os.environ["SHEET_CACHE_DIR"] = os.path.join(SCRATCH_DIR, "sheets")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from DSD import parser as dsd_parser
+from DSD.parser import list_line_items, read_file
+from dsd_vs_expresso import is_cpd
+from fake_gam import FIXTURES_DIR, FakeGamClient, to_soap
+from sheet_rules import get_rule_engine
+import helper_sheet
+import inventory_mirror
+import line_item_details_in_gam as gam
+import targeting_cache
+import utils
+
+SHEET_FIXTURE_PATH = os.path.join(FIXTURES_DIR, "placements_sheet.json")
+SHEET_URL = "https://docs.google.com/spreadsheets/d/offline-benchmark-sheet/edit"
+SAMPLE_REPORTS = sorted(glob.glob(os.path.join(REPO_DIR, "downloads", "DSD_REPORT_*.xls")))
+# Reports are read from copies, so their sidecars are written to the scratch directory
+REPORTS_DIR = os.path.join(SCRATCH_DIR, "downloads")
+# Time regressions smaller than this are noise
+NOISE_FLOOR_MS = 2.0
+
+
+class Fixtures:
+    """Everything the benchmarks read, loaded once."""
+
+    def __init__(self):
+        self.gam = FakeGamClient.from_fixture()
+        with open(SHEET_FIXTURE_PATH, encoding="utf-8") as f:
+            self.sheet = json.load(f)
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        self.reports = [shutil.copy2(path, REPORTS_DIR) for path in SAMPLE_REPORTS]
+        self.line_item_names = list(dict.fromkeys(
+            name for path in self.reports for name in quiet(list_line_items, path)
+        ))
+
+    def calls(self) -> Dict[str, int]:
+        """GAM calls by service.method plus the Sheets requests made since the last reset."""
+        counts = self.gam.call_counts()
+        for stat in ("drive_checks", "downloads"):
+            if helper_sheet.sheet_sync_stats[stat]:
+                counts[f"Sheets.{stat}"] = helper_sheet.sheet_sync_stats[stat]
+        return counts
+
+    def reset_calls(self):
+        self.gam.calls.clear()
+        for stat in helper_sheet.sheet_sync_stats:
+            helper_sheet.sheet_sync_stats[stat] = 0
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def fresh_gam_caches():
+    """Empty inventory mirror and targeting cache, as on a first run."""
+    inventory_mirror._default_mirror = inventory_mirror.InventoryMirror(tempfile.mktemp(dir=SCRATCH_DIR))
+    targeting_cache._default_cache = targeting_cache.TargetingCache(tempfile.mktemp(dir=SCRATCH_DIR))
+
+
+BENCHMARKS: Dict[str, Dict[str, Callable]] = {}
+
+
+def benchmark(name: str, prepare: Callable[[Fixtures], Any] = lambda fx: fx):
+    """
+    Register `run(state)` as benchmark `name`. `prepare(fixtures)` runs untimed before every
+    repetition and returns the state `run` gets.
+    """
+    def decorator(run):
+        BENCHMARKS[name] = {"prepare": prepare, "run": run}
+        return run
+    return decorator
+
+
+# ---------------------------------------------------
+# DSD
+# ---------------------------------------------------
+
+def _cold_reports(fx):
+    """Nothing parsed in memory and no sidecars on disk: every report is parsed from Excel."""
+    dsd_parser._report_cache.clear()
+    for path in fx.reports:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(dsd_parser.sidecar_path(path))
+    return fx
+
+
+@benchmark("read_file.cold", prepare=_cold_reports)
+def bench_read_file_cold(fx):
+    for path in fx.reports:
+        for name in fx.line_item_names:
+            read_file(name, path=path)
+
+
+def _sidecar_reports(fx):
+    """Nothing parsed in memory, but every report has its sidecar, as for a later run."""
+    dsd_parser._report_cache.clear()
+    for path in fx.reports:
+        if not os.path.exists(dsd_parser.sidecar_path(path)):
+            dsd_parser.read_report_frame(path)
+    return fx
+
+
+@benchmark("read_file.sidecar", prepare=_sidecar_reports)
+def bench_read_file_sidecar(fx):
+    for path in fx.reports:
+        for name in fx.line_item_names:
+            read_file(name, path=path)
+
+
+def _warm_reports(fx):
+    bench_read_file_cold(fx)
+    return fx
+
+
+@benchmark("read_file.warm", prepare=_warm_reports)
+def bench_read_file_warm(fx):
+    for path in fx.reports:
+        for name in fx.line_item_names:
+            read_file(name, path=path)
+
+
+# ---------------------------------------------------
+# Placements sheet
+# ---------------------------------------------------
+
+def _sheet_snapshot(fx):
+    """Seed the sheet cache with the snapshot as if Drive was checked a moment ago."""
+    spreadsheet_id = helper_sheet.extract_id_from_url(SHEET_URL)
+    path = helper_sheet._sheet_cache_path(spreadsheet_id, fx.sheet["worksheet"], None)
+    helper_sheet._write_sheet_cache(path, {
+        "modified_time": "snapshot", "checked_at": time.time(), "values": fx.sheet["values"],
+    })
+    get_rule_engine().cache_clear()
+    return fx
+
+
+@benchmark("filter_df", prepare=_sheet_snapshot)
+def bench_filter_df(fx):
+    return helper_sheet.filter_df(fx.sheet["worksheet"], SHEET_URL)
+
+
+# ---------------------------------------------------
+# GAM
+# ---------------------------------------------------
+
+def _cold_gam(fx):
+    fresh_gam_caches()
+    return fx
+
+
+@benchmark("get_line_items_details_by_name.cold", prepare=_cold_gam)
+def bench_line_items_cold(fx):
+    for name in fx.line_item_names:
+        gam.get_line_items_details_by_name(fx.gam, name)
+
+
+def _warm_gam(fx):
+    """Mirror and targeting cache already hold every name the line items reference."""
+    bench_line_items_cold(fx)
+    return fx
+
+
+@benchmark("get_line_items_details_by_name.warm", prepare=_warm_gam)
+def bench_line_items_warm(fx):
+    for name in fx.line_item_names:
+        gam.get_line_items_details_by_name(fx.gam, name)
+
+
+@benchmark("inventory_mirror.sync", prepare=_cold_gam)
+def bench_inventory_sync(fx):
+    inventory_mirror.get_inventory_mirror().sync(fx.gam)
+
+
+def _cpd_inputs(fx):
+    if not hasattr(fx, "cpd_inputs"):
+        name = fx.line_item_names[0]
+        records = quiet(gam.get_line_items_details_by_name, fx.gam, name)
+        dsd_data = quiet(read_file, name, path=fx.reports[0])
+        fx.cpd_inputs = (records, dsd_data, [p["name"] for p in fx.gam.tables["placements"]])
+    return fx.cpd_inputs
+
+
+@benchmark("is_cpd", prepare=_cpd_inputs)
+def bench_is_cpd(inputs):
+    records, dsd_data, placements = inputs
+    return is_cpd(records, dsd_data, dsd_placements=placements)
+
+
+# ---------------------------------------------------
+# Dates
+# ---------------------------------------------------
+
+def _daypart_inputs(fx):
+    return [
+        item["targeting"]["dayPartTargeting"]["dayParts"]
+        for item in fx.gam.tables["line_items"]
+        if (item.get("targeting") or {}).get("dayPartTargeting")
+    ]
+
+
+@benchmark("expand_daypart_windows", prepare=_daypart_inputs)
+def bench_daypart_windows(day_parts_per_item):
+    # What a line item record keeps: the windows and their run counts, no dates
+    for day_parts in day_parts_per_item:
+        for window in gam.expand_daypart_windows("2025-04-01", "2026-03-31", day_parts):
+            window.count
+
+
+@benchmark("expand_daypart_to_dates", prepare=_daypart_inputs)
+def bench_expand_daypart(day_parts_per_item):
+    # A year-long flight for every dayparted line item
+    for day_parts in day_parts_per_item:
+        gam.expand_daypart_to_dates("2025-04-01", "2026-03-31", day_parts)
+
+
+def _date_inputs(fx):
+    utils._parse_datetime.cache_clear()
+    if not hasattr(fx, "date_inputs"):
+        values = []
+        for path in fx.reports:
+            for name in fx.line_item_names:
+                records = quiet(read_file, name, path=path)
+                for record in records if isinstance(records, list) else [records]:
+                    values += [record.get(c) for c in ("Start_Date", "End_Date", "PHB Booking Date", "HB Booking Date")]
+        for item in fx.gam.tables["line_items"]:
+            values += [gam.parse_gam_date(to_soap(item[field])) for field in ("startDateTime", "endDateTime")]
+        fx.date_inputs = values
+    return fx.date_inputs
+
+
+@benchmark("parse_date", prepare=_date_inputs)
+def bench_parse_date(values):
+    for value in values:
+        utils.parse_date(value)
+
+
+# ---------------------------------------------------
+# Runner
+# ---------------------------------------------------
+
+def run_benchmark(fx: Fixtures, name: str, repeat: int) -> Dict[str, Any]:
+    spec = BENCHMARKS[name]
+    timings = []
+    for _ in range(repeat):
+        state = quiet(spec["prepare"], fx)
+        fx.reset_calls()
+        start = time.perf_counter()
+        quiet(spec["run"], state)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "calls": fx.calls(),
+    }
+
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        limit = max(base["min_ms"] * (1 + tolerance), base["min_ms"] + NOISE_FLOOR_MS)
+        if result["min_ms"] > limit:
+            regressions.append(f"{name}: {base['min_ms']:.2f} ms -> {result['min_ms']:.2f} ms")
+        for call, count in result["calls"].items():
+            if count > base["calls"].get(call, 0):
+                regressions.append(f"{name}: {call} calls {base['calls'].get(call, 0)} -> {count}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Run the offline QC pipeline benchmarks.")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    arg_parser.add_argument("--save", help="Write the results as JSON to this file")
+    arg_parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    arg_parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown against the baseline")
+    args = arg_parser.parse_args()
+
+    fx = Fixtures()
+    results = {}
+    print(f"{'benchmark':<40} {'min ms':>10} {'median ms':>10}  calls")
+    for name in args.only or BENCHMARKS:
+        results[name] = run_benchmark(fx, name, args.repeat)
+        calls = ", ".join(f"{call}={count}" for call, count in results[name]["calls"].items()) or "-"
+        print(f"{name:<40} {results[name]['min_ms']:>10.2f} {results[name]['median_ms']:>10.2f}  {calls}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "benchmarks": results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["benchmarks"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
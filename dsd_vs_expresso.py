@@ -1,17 +1,13 @@
 from DSD.parser import read_file
 from DSD.download import Dsd_Download
-from utils import parse_date
-from typing import Tuple, Dict
-from googleads import ad_manager
-from line_item_details_in_gam import get_line_items_details_by_name
+from typing import Tuple, Dict, List
+from line_item_details_in_gam import get_gam_client, iter_line_items_details_by_name
 from dotenv import load_dotenv
-from gamPlacements import placement_names
-import os
+from qc_checks import CHECK_SETS, Check, checks_for, get_checks, required_gam_fields, run_checks
+import argparse
+import instrumentation
 
 load_dotenv()
-NEW_GAM = os.getenv("NEW_GAM")
-
-client = ad_manager.AdManagerClient.LoadFromStorage(NEW_GAM)
 
 
 def clean_line_item_name(name: str) -> str:
@@ -20,124 +16,37 @@ def clean_line_item_name(name: str) -> str:
     return name
 
 
-def normalize_geo_list(geo_value):
-    """Convert a string or list of geos into a clean list of strings."""
-    if isinstance(geo_value, str):
-        return [g.strip() for g in geo_value.split(",") if g.strip()]
-    elif isinstance(geo_value, list):
-        return [g.strip() if isinstance(g, str) else g for g in geo_value]
-    return []
+def compare_line_items(gam_data, dsd_data, checks: List[Check], dsd_placements: List[str] = None) -> Tuple[Dict, int]:
+    """
+    Run `checks` (see qc_checks) for every GAM line item against the DSD record.
+    `dsd_placements` defaults to the placement names resolved from the media plan sheet.
+    Returns (result_dict, status_code)
+    """
+    # With streamed GAM data the page fetches run inside this span; its self time is the comparison alone
+    with instrumentation.span("qc.compare", checks=len(checks)):
+        result = run_checks(gam_data, dsd_data, checks, options={"dsd_placements": dsd_placements})
 
+    print("\nMatched Fields:\n", result["matched_fields"])
+    print("\nUnmatched Fields:\n", result["unmatched_fields"])
 
-def normalize_list(value):
-    """Ensure value is always a list of stripped strings."""
-    if isinstance(value, str):
-        return [value.strip()]
-    elif isinstance(value, list):
-        return [str(v).strip() for v in value]
-    return []
+    return result, 200
 
-def is_cpd(gam_data, dsd_data) -> Tuple[Dict, int]:
+def is_cpd(gam_data, dsd_data, dsd_placements: List[str] = None) -> Tuple[Dict, int]:
     """
-    Compare DSD Excel data vs Expresso GAM data for a given line item name.
+    Compare DSD Excel data vs Expresso GAM data for a given line item name with the CPD checks.
     Returns (result_dict, status_code)
     """
-    #line_item_name = input("Enter Parent Line Item Name: ")
-    
-    matched, unmatched = {}, {}
-    # Normalize DSD placements (from placement_names)
-    dsd_placements_list = normalize_list(placement_names)
-    # --- Loop through GAM data ---
-    for g in gam_data:
-
-        g_name = g.get("name", "Unknown Line Item")
-
-        # Normalize GAM placements
-        gam_placement = g.get("targetedPlacement")
-        gam_placements_list = normalize_list(gam_placement)
-
-        # --- Compare scalar fields ---
-        checks = {
-            "cpd_daily_rate": (g.get("cpd_daily_rate"), dsd_data.get("Rate")),
-            "currency_code": (g.get("currency_code"), dsd_data.get("Currency")),
-            "start_date": (parse_date(g.get("start_date")), parse_date(dsd_data.get("PHB Booking Date"))),
-            "end_date": (parse_date(g.get("end_date")), parse_date(dsd_data.get("PHB Booking Date"))),
-            "start_time": (g.get("start_time"), "00:00:00"),
-            "end_time": (g.get("end_time"), "23:59:59"),
-        } 
-       
-        for field, (g_val, d_val) in checks.items():
-            if g_val == d_val:
-                matched[field] = {"gam": g_val, "dsd": d_val}
-            else:
-                unmatched.setdefault(field, {"gam": g_val, "dsd": d_val, "unmatch_line_item": []})
-                if g_name not in unmatched[field]["unmatch_line_item"]:
-                    unmatched[field]["unmatch_line_item"].append(g_name)
-
-        # --- Compare targetedPlacement properly ---
-        gam_missing = [v for v in gam_placements_list if v not in dsd_placements_list]
-        dsd_missing = [v for v in dsd_placements_list if v not in gam_placements_list]
-
-        if not gam_missing and not dsd_missing:
-            matched["targetedPlacement"] = {
-                "gam": gam_placements_list,
-                "dsd": dsd_placements_list
-            }
-        else:
-            unmatched.setdefault(
-                "targetedPlacement",
-                {
-                    "gam_missing": gam_missing,
-                    "dsd_missing": dsd_missing,
-                    "unmatch_line_item": []
-                }
-            )
-            if g_name not in unmatched["targetedPlacement"]["unmatch_line_item"]:
-                unmatched["targetedPlacement"]["unmatch_line_item"].append(g_name)
-
-        # --- Compare GEO & EXCLUDED_GEO lists ---
-        list_fields = [
-            ("included_geo", g.get("geo"), dsd_data.get("Geo_Target")),
-            ("excluded_geo", g.get("excluded_geo"), dsd_data.get("Geo_Exclusion")),
-        ]
-
-        for field_name, gam_val, dsd_val in list_fields:
-            gam_list = normalize_geo_list(gam_val)
-            dsd_list = normalize_geo_list(dsd_val)
-
-            gam_missing = [v for v in gam_list if v not in dsd_list]
-            dsd_missing = [v for v in dsd_list if v not in gam_list]
-
-            if not gam_missing and not dsd_missing:
-                matched[field_name] = {"gam": gam_list, "dsd": dsd_list}
-            else:
-                unmatched.setdefault(
-                    field_name,
-                    {
-                        "gam_missing": gam_missing,
-                        "dsd_missing": dsd_missing,
-                        "unmatch_line_item": []
-                    },
-                )
-                if g_name not in unmatched[field_name]["unmatch_line_item"]:
-                    unmatched[field_name]["unmatch_line_item"].append(g_name)
-
-    print("\nMatched Fields:\n", matched)
-    print("\nUnmatched Fields:\n", unmatched)
-  
-
-    return {"matched_fields": matched, "unmatched_fields": unmatched}, 200
+    return compare_line_items(gam_data, dsd_data, get_checks(CHECK_SETS["CPD"]), dsd_placements)
 
-def dsd_vs_expresso(line_item_name: str) -> Tuple[Dict, int]:
+def qc_line_item(line_item_name: str, dsd_path: str = None, checks: List[Check] = None) -> Tuple[Dict, int]:
     """
-    Compare DSD Excel data vs Expresso GAM data for a given line item name.
+    Compare an already downloaded DSD report against GAM for one line item name.
+    `dsd_path` is the report to read; without it the report registered for the line item's order is used.
+    `checks` defaults to the CPD or CPM check set, by the DSD's Pricing Type.
     Returns (result_dict, status_code)
     """
-    Dsd_Download(line_item_name[:6])
     line_item_name = clean_line_item_name(line_item_name)
-    gam_data = get_line_items_details_by_name(client=client, line_item_name=line_item_name)
-   
-    dsd_data = read_file(line_item_name)
+    dsd_data = read_file(line_item_name, path=dsd_path)
     
     if not dsd_data:
         return {"message": "Unable to read DSD data"}, 400
@@ -146,10 +55,48 @@ def dsd_vs_expresso(line_item_name: str) -> Tuple[Dict, int]:
     if "double click" not in ad_server or not dsd_data.get("Parent_LI_Name"):
         return {"message": "Invalid Ad Server or missing Parent_LI_Name"}, 400
 
-    is_cpd(gam_data,dsd_data)
+    checks = checks or checks_for(dsd_data)
+    # Streamed page by page: comparison starts on the first page while the next one is fetched, and
+    # each page's name lookups run concurrently. Only the GAM sub-resources the checks read are resolved.
+    gam_data = iter_line_items_details_by_name(
+        client=get_gam_client(), line_item_name=line_item_name, fields=required_gam_fields(checks)
+    )
+    return compare_line_items(gam_data, dsd_data, checks)
+
+def dsd_vs_expresso(line_item_name: str) -> Tuple[Dict, int]:
+    """
+    Compare DSD Excel data vs Expresso GAM data for a given line item name.
+    Returns (result_dict, status_code)
+    """
+    with instrumentation.span("qc.line_item", line_item=line_item_name):
+        _, _, dsd_path = Dsd_Download(line_item_name[:6])
+        return qc_line_item(line_item_name, dsd_path)
 
 #dsd_vs_expresso("27651110DOMEINTERATILBOTHINALLCPMVERNEWSSTDBANFY23TILSTANDARDBANNERPKG215107")
 
 #dsd_vs_expresso(line_item_name="28674670INTLBHARTITILBOTH04ATFCPDTOISOVBIHELECCUSFY25TILMRECPPDPKG217975_MREC_PPD_01ST_NOV")
 
-dsd_vs_expresso(line_item_name="28635260DOMERAYMONTILBOTH1ATFCPDTOIGEORBFULLFY25PAGEPUSHDOWNPKG219849_ppdWAP_LI_ACE")
\ No newline at end of file
+#dsd_vs_expresso(line_item_name="28635260DOMERAYMONTILBOTH1ATFCPDTOIGEORBFULLFY25PAGEPUSHDOWNPKG219849_ppdWAP_LI_ACE")
+
+def main(argv=None):
+    """Pipeline entry point: download each line item's DSD and QC it against GAM."""
+    arg_parser = argparse.ArgumentParser(description="Compare Expresso DSD line items against GAM.")
+    arg_parser.add_argument("line_item_names", nargs="+", help="Parent line item name(s) to QC")
+    arg_parser.add_argument("--metrics", default=instrumentation.QC_METRICS_PATH,
+                            help="JSON file for the run's stage timings and call counters")
+    arg_parser.add_argument("--prom-textfile", default=instrumentation.QC_PROM_TEXTFILE,
+                            help="Also write the run as a Prometheus textfile (node_exporter textfile collector)")
+    args = arg_parser.parse_args(argv)
+
+    instrumentation.start_run("dsd_vs_expresso")
+    try:
+        for line_item_name in args.line_item_names:
+            dsd_vs_expresso(line_item_name)
+    finally:
+        instrumentation.write_json(args.metrics)
+        if args.prom_textfile:
+            instrumentation.write_prometheus_textfile(args.prom_textfile)
+        print(instrumentation.format_summary())
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
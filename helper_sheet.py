@@ -2,94 +2,116 @@ from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
+from sheet_rules import RuleEngine, get_rule_engine
+from instrumentation import count, traced
+from gspread.utils import absolute_range_name, extract_id_from_url, fill_gaps
+from typing import List, Optional
 import gspread
+import threading
+import json
+import time
 import os
 import re
 
 load_dotenv()
 G_CREDS = os.getenv("G_CREDS")
 sheet_url = os.getenv("sheet_url")
+SHEET_CACHE_DIR = os.getenv("SHEET_CACHE_DIR", os.path.join(".cache", "sheets"))
+# Within this many seconds of the last check the local copy is used without asking Drive
+SHEET_CHECK_INTERVAL = int(os.getenv("SHEET_CHECK_INTERVAL", 60))
+
+_gspread_client = None
+_gspread_client_lock = threading.Lock()
+sheet_sync_stats = {"drive_checks": 0, "downloads": 0, "cache_hits": 0}
 
 def get_gspread_client():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(G_CREDS, scope)
-    return gspread.authorize(creds)
+    """Process-wide gspread client, authorized once."""
+    global _gspread_client
+    with _gspread_client_lock:
+        if _gspread_client is None:
+            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+            creds = ServiceAccountCredentials.from_json_keyfile_name(G_CREDS, scope)
+            _gspread_client = gspread.authorize(creds)
+        return _gspread_client
+
+def _sheet_event(kind):
+    """Record a cache hit, Drive check or download in sheet_sync_stats and the run's sheet_fetches."""
+    sheet_sync_stats[kind] += 1
+    count("sheet_fetches", kind=kind)
+
+def _sheet_cache_path(spreadsheet_id, worksheet_name, cell_range):
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{worksheet_name}_{cell_range or 'all'}")
+    return os.path.join(SHEET_CACHE_DIR, f"{spreadsheet_id}_{name}.json")
+
+def _read_sheet_cache(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_sheet_cache(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = path + ".part"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(partial_path, path)
+
+@traced("sheet.fetch")
+def get_worksheet_values(worksheet_name, sheet_url, cell_range: Optional[str] = None) -> List[List[str]]:
+    """
+    Rows of `worksheet_name` (optionally only `cell_range`, e.g. "A:F"), as `get_all_values` returns them.
+
+    The values are kept in a local cache together with the spreadsheet's Drive
+    modifiedTime. They are only downloaded again, with a single values request for the
+    range, when Drive reports a newer modifiedTime. If Drive cannot be reached, the
+    cached copy is used.
+    """
+    spreadsheet_id = extract_id_from_url(sheet_url)
+    path = _sheet_cache_path(spreadsheet_id, worksheet_name, cell_range)
+    cached = _read_sheet_cache(path)
+    if cached and time.time() - cached["checked_at"] < SHEET_CHECK_INTERVAL:
+        _sheet_event("cache_hits")
+        return cached["values"]
 
-def placements(worksheet_name, sheet_url):
     client = get_gspread_client()
-    worksheet = client.open_by_url(sheet_url).worksheet(worksheet_name)
-    data = worksheet.get_all_values()
+    try:
+        modified_time = client.http_client.get_file_drive_metadata(spreadsheet_id)["modifiedTime"]
+        _sheet_event("drive_checks")
+    except gspread.exceptions.APIError as e:
+        if not cached:
+            raise
+        print(f"⚠️ Could not check {worksheet_name} for changes ({e}), using the copy from {cached['modified_time']}")
+        _sheet_event("cache_hits")
+        return cached["values"]
+
+    if cached and cached["modified_time"] == modified_time:
+        cached["checked_at"] = time.time()
+        _write_sheet_cache(path, cached)
+        _sheet_event("cache_hits")
+        return cached["values"]
+
+    response = client.http_client.values_get(spreadsheet_id, absolute_range_name(worksheet_name, cell_range))
+    _sheet_event("downloads")
+    values = fill_gaps(response.get("values", []))
+    _write_sheet_cache(path, {"modified_time": modified_time, "checked_at": time.time(), "values": values})
+    print(f"Downloaded {len(values)} rows of {worksheet_name} (modified {modified_time})")
+    return values
+
+def placements(worksheet_name, sheet_url, cell_range: Optional[str] = None):
+    data = get_worksheet_values(worksheet_name, sheet_url, cell_range)
     df = pd.DataFrame(data[1:], columns=data[0])
     return df
 
-def filter_df(TAB,sheet_url):
-    # Load data
-    for_filter_df = placements(
-        TAB,
-        sheet_url
-    )
-
-    # ---------------------------------------------------
-    # 1. CLEANUP TEXT
-    # ---------------------------------------------------
-
-    # Remove word "website" (case-insensitive)
-    for_filter_df = for_filter_df.applymap(
-        lambda x: re.sub(r'website', '', str(x), flags=re.IGNORECASE)
-    )
-
-    # Remove prefix 'TIL_' from Ad Unit Type
-    for_filter_df['Ad Unit Type'] = (
-        for_filter_df['Ad Unit Type']
-        .str.replace(r'^TIL_', '', regex=True)
-    )
-    for_filter_df['Section'] = (
-    for_filter_df['Section']
-        .str.replace(r'(?i)\(\s*Excl PTG\s*\)', '', regex=True)
-        .str.strip()
-)
-    # Normalize MREC PPD to MREC
-    for_filter_df = for_filter_df.replace(
-        {r'(?i)\bMREC PPD\b': 'MREC'}, regex=True
-    )
-    for_filter_df = for_filter_df.replace(
-        {r'(?i)\b(?:MWEB PPD|Page Push Down)\b': 'TOP_BANNER'}, regex=True
-    )
-    for_filter_df = for_filter_df.replace(
-        {r'(?i)\bBillboard\b': 'Leaderboard'}, regex=True
-    )
-    # ---------------------------------------------------
-    # 2. PLATFORM NORMALIZATION (clean Website column)
-    # ---------------------------------------------------
-
-    platform_map = {
-        r'(?i)\b(Mobile Site?|MWEB|Mobile)\b': 'MWEB',
-        r'(?i)\b(Android Apps?|Android APP|Android)\b': 'AOS',
-        r'(?i)\b(iOS Apps?|iOS App)\b': 'IOS',
-        r'(?i)\b(Amp site?|Amp sites?)\b': 'AMP'
-    }
-
-    for pattern, replacement in platform_map.items():
-        for_filter_df['Website'] = for_filter_df['Website'].str.replace(
-            pattern, replacement, regex=True
-        )
-
-    # ---------------------------------------------------
-    # 3. PLATFORM DETECTION (final platform column)
-    # ---------------------------------------------------
-
-    for_filter_df["platform"] = (
-        for_filter_df["Website"]
-        .str.extract(r'\b(AMP|MWEB|AOS|IOS)\b', expand=False)
-        .fillna("Web")
-    )
-    # Remove platform codes from Website column
-    for_filter_df['Website'] = (
-        for_filter_df['Website']
-        .str.replace(r'\b(AMP|MWEB|AOS|IOS)\b', '', regex=True, case=False)
-        .str.replace(r'\s+', ' ', regex=True)
-    )
-
-    return for_filter_df
+@traced("sheet.normalize")
+def normalize_sheet(sheet_df, engine: RuleEngine = None):
+    """
+    Normalize a raw placements sheet with the rules in sheet_rules.yaml: clean up the
+    text of every column, normalize ad format names, and split the platform out of the
+    Website column into a new `platform` column (AMP, MWEB, AOS, IOS or Web).
+    """
+    return (engine or get_rule_engine()).apply(sheet_df)
 
 
+def filter_df(TAB,sheet_url):
+    return normalize_sheet(placements(TAB, sheet_url))
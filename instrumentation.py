@@ -0,0 +1,289 @@
+"""
+Per-run tracing spans and call counters for the QC pipeline.
+
+Stages are timed with `span("stage.name")` (or the `traced` decorator); spans nest per
+thread / asyncio task, so each stage reports both its total time and its self time
+(excluding the stages it called). Counters record GAM calls by service and method,
+database queries and sheet fetches, each with the time spent in them.
+
+A run is emitted as structured JSON (`write_json`) and optionally as a Prometheus
+textfile for node_exporter's textfile collector (`write_prometheus_textfile`).
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from typing import Any, Dict, Optional, Tuple
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+# Where the CLIs write each run's metrics; QC_PROM_TEXTFILE additionally writes a Prometheus textfile
+QC_METRICS_PATH = os.getenv("QC_METRICS_PATH", "qc_metrics.json")
+QC_PROM_TEXTFILE = os.getenv("QC_PROM_TEXTFILE")
+# Individual spans kept per run; stage totals keep counting past it
+MAX_SPANS = int(os.getenv("QC_MAX_SPANS", 10000))
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("qc_span", default=None)
+
+
+class Span:
+    """One timed stage. `child_s` accumulates the time of the spans opened inside it."""
+    __slots__ = ("id", "parent_id", "name", "attrs", "thread", "start", "duration", "child_s")
+
+    def __init__(self, span_id: int, parent: Optional["Span"], name: str, attrs: Dict[str, Any]):
+        self.id = span_id
+        self.parent_id = parent.id if parent else None
+        self.name = name
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.child_s = 0.0
+
+    @property
+    def self_s(self) -> float:
+        # Concurrent children (asyncio.gather) can add up to more than the parent's wall time
+        return max(self.duration - self.child_s, 0.0)
+
+
+class Run:
+    """Spans and counters of one QC run, shared by every thread of the process."""
+
+    def __init__(self, name: str = "qc"):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.dropped_spans = 0
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, float]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_span(self, parent: Optional[Span], name: str, attrs: Dict[str, Any]) -> Span:
+        return Span(next(self._ids), parent, name, attrs)
+
+    def finish_span(self, span: Span):
+        with self._lock:
+            stage = self.stages.setdefault(span.name, {"count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0})
+            stage["count"] += 1
+            stage["total_s"] += span.duration
+            stage["self_s"] += span.self_s
+            stage["max_s"] = max(stage["max_s"], span.duration)
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def count(self, metric: str, seconds: Optional[float] = None, n: int = 1, **labels):
+        key = (metric, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            counter = self.counters.setdefault(key, {"count": 0, "seconds": 0.0})
+            counter["count"] += n
+            if seconds is not None:
+                counter["seconds"] += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1]["self_s"], reverse=True)
+            counters = sorted(self.counters.items())
+            spans = list(self.spans)
+            dropped = self.dropped_spans
+        return {
+            "run": self.name,
+            "started_at": self.started_at.isoformat(),
+            "wall_s": round(time.perf_counter() - self.start, 6),
+            "stages": {name: {k: round(v, 6) for k, v in stage.items()} for name, stage in stages},
+            "counters": [
+                {"name": metric, "labels": dict(labels), "count": counter["count"], "seconds": round(counter["seconds"], 6)}
+                for (metric, labels), counter in counters
+            ],
+            "spans": [
+                {
+                    "id": s.id, "parent_id": s.parent_id, "name": s.name, "thread": s.thread,
+                    "start_s": round(s.start - self.start, 6), "duration_s": round(s.duration, 6),
+                    "self_s": round(s.self_s, 6), **({"attrs": s.attrs} if s.attrs else {}),
+                }
+                for s in spans
+            ],
+            "dropped_spans": dropped,
+        }
+
+
+_run = None
+_run_lock = threading.Lock()
+
+
+def get_run() -> Run:
+    """The process-wide run, started on first use."""
+    global _run
+    with _run_lock:
+        if _run is None:
+            _run = Run()
+        return _run
+
+
+def start_run(name: str = "qc") -> Run:
+    """Begin a new run; spans and counters recorded after this belong to it."""
+    global _run
+    with _run_lock:
+        _run = Run(name)
+        return _run
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the enclosed block as stage `name`. Yields the span so attrs can be added."""
+    run = get_run()
+    parent = _current_span.get()
+    current = run.new_span(parent, name, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        if parent is not None:
+            parent.child_s += current.duration
+        run.finish_span(current)
+
+
+def traced(name: str):
+    """Decorator running every call of the (sync or async) function inside `span(name)`."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(metric: str, seconds: Optional[float] = None, n: int = 1, **labels):
+    """Add `n` to counter `metric` of the current run (and `seconds` to its time)."""
+    get_run().count(metric, seconds=seconds, n=n, **labels)
+
+
+class InstrumentedService:
+    """Wraps a googleads service so every method call is counted as a gam_calls{service, method}."""
+
+    def __init__(self, service, service_name: str):
+        self._service = service
+        self._service_name = service_name
+
+    def __getattr__(self, method):
+        target = getattr(self._service, method)
+        if not callable(target):
+            return target
+
+        @functools.wraps(target)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                count("gam_calls", seconds=time.perf_counter() - start, service=self._service_name, method=method)
+        return call
+
+
+def instrument_engine(engine):
+    """Count every statement the SQLAlchemy `engine` executes as db_queries."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("qc_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["qc_query_start"].pop()
+        count("db_queries", seconds=time.perf_counter() - start, database=engine.url.database)
+
+    return engine
+
+
+def _atomic_write(path: str, text: str):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = path + ".part"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(partial_path, path)
+
+
+def write_json(path: str = QC_METRICS_PATH, run: Run = None):
+    """Write the run (stages, counters and spans) as JSON."""
+    _atomic_write(path, json.dumps((run or get_run()).to_dict(), indent=2, default=str))
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(run: Run = None) -> str:
+    """The run as Prometheus text exposition: gauges describing the last run."""
+    data = (run or get_run()).to_dict()
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+
+    metric("qc_run_timestamp_seconds", "Unix time the last QC run started.",
+           [({"run": data["run"]}, datetime.fromisoformat(data["started_at"]).timestamp())])
+    metric("qc_run_duration_seconds", "Wall time of the last QC run.", [({"run": data["run"]}, data["wall_s"])])
+    for name, field, help_text in (
+        ("qc_run_stage_total_seconds", "total_s", "Time spent in each stage of the last QC run, including nested stages."),
+        ("qc_run_stage_self_seconds", "self_s", "Time spent in each stage of the last QC run, excluding nested stages."),
+        ("qc_run_stage_spans", "count", "Times each stage ran in the last QC run."),
+    ):
+        metric(name, help_text, [({"stage": stage_name}, stage[field]) for stage_name, stage in data["stages"].items()])
+
+    by_metric: Dict[str, list] = {}
+    for counter in data["counters"]:
+        by_metric.setdefault(counter["name"], []).append(counter)
+    for name, counters in sorted(by_metric.items()):
+        metric(f"qc_run_{name}", f"{name} in the last QC run.", [(c["labels"], c["count"]) for c in counters])
+        metric(f"qc_run_{name}_seconds", f"Time spent in {name} in the last QC run.",
+               [(c["labels"], c["seconds"]) for c in counters])
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: str = QC_PROM_TEXTFILE, run: Run = None):
+    """Write the run for node_exporter's textfile collector (atomically, so it never reads half a file)."""
+    _atomic_write(path, prometheus_text(run))
+
+
+def format_summary(run: Run = None, top: int = 8) -> str:
+    """Short human-readable summary: the stages with the most self time and the call counters."""
+    data = (run or get_run()).to_dict()
+    lines = [f"⏱️ {data['run']} run: {data['wall_s']:.2f}s"]
+    for name, stage in list(data["stages"].items())[:top]:
+        lines.append(f"   {name:<32} self {stage['self_s']:8.3f}s  total {stage['total_s']:8.3f}s  x{stage['count']}")
+    for counter in data["counters"]:
+        labels = ", ".join(f"{k}={v}" for k, v in counter["labels"].items())
+        lines.append(f"   {counter['name']}({labels}): {counter['count']} in {counter['seconds']:.3f}s")
+    return "\n".join(lines)
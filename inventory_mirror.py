@@ -0,0 +1,229 @@
+from dotenv import load_dotenv
+from instrumentation import InstrumentedService, traced
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import os
+
+load_dotenv()
+INVENTORY_MIRROR_PATH = os.getenv("INVENTORY_MIRROR_PATH", os.path.join(".cache", "inventory.sqlite3"))
+# Ad units and placements do get renamed; a name older than this is looked up again
+INVENTORY_MIRROR_MAX_AGE = int(os.getenv("INVENTORY_MIRROR_MAX_AGE", 24 * 3600))
+# PQL select pages; GAM caps a page at 500 rows
+PQL_PAGE_SIZE = 500
+# PQL tables mirrored locally
+PQL_TABLES = ("Ad_Unit", "Placement")
+# SQLite caps host parameters per statement at 999 on older builds
+SQLITE_MAX_PARAMS = 900
+
+
+def _pql_value(value):
+    """Plain Python value of one PQL cell (TextValue, NumberValue, DateTimeValue, ...)."""
+    return getattr(value, 'value', None) if value is not None else None
+
+
+def _datetime_parts(value) -> Dict:
+    """A PQL DateTimeValue as a plain dict, usable both as a bind value and as JSON."""
+    date = getattr(value, 'date')
+    return {
+        'date': {'year': getattr(date, 'year'), 'month': getattr(date, 'month'), 'day': getattr(date, 'day')},
+        'hour': getattr(value, 'hour'),
+        'minute': getattr(value, 'minute'),
+        'second': getattr(value, 'second'),
+        'timeZoneId': getattr(value, 'timeZoneId'),
+    }
+
+
+def _iso(parts: Dict) -> str:
+    date = parts['date']
+    return (f"{date['year']:04d}-{date['month']:02d}-{date['day']:02d}"
+            f"T{parts['hour']:02d}:{parts['minute']:02d}:{parts['second']:02d}")
+
+
+def sync_statement(pql_table: str, watermark: Optional[Dict], offset: int) -> Dict:
+    """
+    PQL select of (Id, Name, LastModifiedDateTime) from `pql_table`, oldest change first.
+
+    With a watermark only rows modified at or after it are selected; `>=` re-reads rows
+    that share the watermark's second, which is harmless since rows are upserted.
+    """
+    query = f"SELECT Id, Name, LastModifiedDateTime FROM {pql_table}"
+    values = []
+    if watermark:
+        query += " WHERE LastModifiedDateTime >= :since"
+        values.append({'key': 'since', 'value': {'xsi_type': 'DateTimeValue', 'value': watermark}})
+    query += f" ORDER BY LastModifiedDateTime ASC LIMIT {PQL_PAGE_SIZE} OFFSET {offset}"
+    return {'query': query, 'values': values}
+
+
+class InventoryMirror:
+    """
+    Local SQLite copy of the network's ad unit and placement names.
+
+    `sync` pages through the `Ad_Unit` and `Placement` PQL tables. The first sync reads
+    the whole table; later ones only read rows whose LastModifiedDateTime is at or after
+    the newest one already mirrored. Lookups never call GAM: they return the names the
+    mirror has and the IDs it does not, so the caller can fetch those in bulk and
+    `put_names` them back. A name synced or stored more than `max_age` seconds ago counts
+    as missing, so a renamed ad unit or placement is picked up even without a sync.
+    """
+
+    def __init__(self, path: str = INVENTORY_MIRROR_PATH, max_age: int = INVENTORY_MIRROR_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS inventory (
+                pql_table TEXT NOT NULL,
+                id TEXT NOT NULL,
+                name TEXT,
+                last_modified TEXT,
+                synced_at REAL,
+                PRIMARY KEY (pql_table, id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                pql_table TEXT PRIMARY KEY,
+                watermark TEXT,
+                synced_at REAL NOT NULL
+            );
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(inventory)")]
+        if "synced_at" not in columns:
+            # Mirrors created before names had a sync time; their rows count as stale
+            self._conn.execute("ALTER TABLE inventory ADD COLUMN synced_at REAL")
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.max_age
+
+    def get_names(self, pql_table: str, ids: Iterable) -> Tuple[Dict[str, str], List[str]]:
+        """Return ({id: name} the mirror has fresh, [ids it does not have or has stale]) with IDs as strings."""
+        wanted = list(dict.fromkeys(str(i) for i in ids if i is not None))
+        found = {}
+        with self._lock:
+            for start in range(0, len(wanted), SQLITE_MAX_PARAMS):
+                chunk = wanted[start:start + SQLITE_MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT id, name FROM inventory WHERE pql_table = ? AND synced_at >= ? "
+                    f"AND id IN ({', '.join('?' * len(chunk))})",
+                    (pql_table, self._fresh_after(), *chunk),
+                )
+                found.update(rows)
+            missing = [i for i in wanted if i not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put_names(self, pql_table: str, names: Dict[str, str]):
+        """Store names fetched from the entity services, fresh for another `max_age` seconds."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO inventory (pql_table, id, name, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (pql_table, id) DO UPDATE SET name = excluded.name, synced_at = excluded.synced_at",
+                [(pql_table, str(i), name, now) for i, name in names.items()],
+            )
+
+    def watermark(self, pql_table: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM sync_state WHERE pql_table = ?", (pql_table,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _store_page(self, pql_table: str, rows, watermark: Optional[Dict]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO inventory (pql_table, id, name, last_modified, synced_at) VALUES (?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (pql_table, watermark, synced_at) VALUES (?, ?, ?)",
+                (pql_table, json.dumps(watermark) if watermark else None, now),
+            )
+
+    def _mark_synced(self, pql_table: str, synced_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE inventory SET synced_at = ? WHERE pql_table = ? AND (synced_at IS NULL OR synced_at < ?)",
+                (synced_at, pql_table, synced_at),
+            )
+
+    @traced("inventory_mirror.sync")
+    def sync_table(self, pql_service, pql_table: str, full: bool = False) -> int:
+        """
+        Pull `pql_table` rows changed since the last sync (every row when `full`).
+
+        The watermark advances after each stored page, so an interrupted sync resumes
+        where it stopped. A completed sync leaves every mirrored row of the table current,
+        changed or not, so all of them are fresh again. Returns the number of rows read.
+        """
+        started = time.time()
+        watermark = None if full else self.watermark(pql_table)
+        newest = watermark
+        offset = 0
+        read = 0
+        while True:
+            response = pql_service.select(sync_statement(pql_table, watermark, offset))
+            rows = (response['rows'] if 'rows' in response else None) or []
+            page = []
+            for row in rows:
+                entity_id, name, modified = row['values']
+                newest = _datetime_parts(_pql_value(modified))
+                page.append((pql_table, str(_pql_value(entity_id)), _pql_value(name), _iso(newest)))
+            self._store_page(pql_table, page, newest)
+            read += len(page)
+            if len(rows) < PQL_PAGE_SIZE:
+                self._mark_synced(pql_table, started)
+                return read
+            offset += PQL_PAGE_SIZE
+
+    def sync(self, client, tables: Iterable[str] = PQL_TABLES, full: bool = False) -> Dict[str, int]:
+        """Sync every table in `tables` through PublisherQueryLanguageService; returns rows read per table."""
+        pql_service = InstrumentedService(client.GetService('PublisherQueryLanguageService', version='v202411'),
+                                          'PublisherQueryLanguageService')
+        return {table: self.sync_table(pql_service, table, full) for table in tables}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT pql_table, COUNT(*) FROM inventory GROUP BY pql_table"))
+        return {"hits": self.hits, "misses": self.misses, "rows": counts}
+
+
+_default_mirror = None
+_default_mirror_lock = threading.Lock()
+
+
+def get_inventory_mirror() -> InventoryMirror:
+    """Process-wide mirror at INVENTORY_MIRROR_PATH, opened on first use."""
+    global _default_mirror
+    with _default_mirror_lock:
+        if _default_mirror is None:
+            _default_mirror = InventoryMirror()
+        return _default_mirror
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Sync the local mirror of GAM ad units and placements.")
+    arg_parser.add_argument("--full", action="store_true", help="Re-read every row instead of only recent changes")
+    arg_parser.add_argument("--table", choices=PQL_TABLES, action="append", help="Table to sync (default: all)")
+    args = arg_parser.parse_args()
+
+    from line_item_details_in_gam import get_gam_client
+
+    mirror = get_inventory_mirror()
+    for table, read in mirror.sync(get_gam_client(), args.table or PQL_TABLES, full=args.full).items():
+        print(f"{table}: {read} rows synced")
+    print(f"Mirror rows: {mirror.stats()['rows']}")
+
+
+if __name__ == "__main__":
+    main()
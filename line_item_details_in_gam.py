@@ -2,12 +2,25 @@ from googleads import ad_manager
 from dotenv import load_dotenv
 import os
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-import calendar
+from typing import List, Dict, Any, AsyncIterator, Collection, Iterator, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from dataclasses import dataclass, fields as dataclass_fields, replace
+import numpy as np
+import sys
+import threading
+import asyncio
+
+from targeting_cache import TargetingCache, get_targeting_cache
+from inventory_mirror import InventoryMirror, get_inventory_mirror
+from instrumentation import InstrumentedService, span, traced
 
 load_dotenv()
 NEW_GAM = os.environ.get("NEW_GAM")
+logger = logging.getLogger(__name__)
+
+# Line items requested per getLineItemsByStatement page
+LINE_ITEM_PAGE_SIZE = ad_manager.SUGGESTED_PAGE_LIMIT
 
 GAM_MINUTES = {
     "ZERO": 0,
@@ -19,47 +32,105 @@ GAM_MINUTES = {
 #---------------------------------------------------------------------------------------------------------------------------------------------
 #                           Helper Functions for Daypart Expansion , Placement and AdUnit Names
 #---------------------------------------------------------------------------------------------------------------------------------------------
-def expand_daypart_to_dates(start_date, end_date, day_parts):
+# GAM dayOfWeek values in NumPy weekmask order (Monday first)
+WEEKDAYS = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY")
+
+
+def _daypart_clock(time_obj) -> Tuple[int, int]:
+    return time_obj.get('hour', 0), GAM_MINUTES.get(time_obj.get('minute', 'ZERO'), 0)
+
+
+class DaypartWindow:
+    """
+    One distinct daily time window of a line item's dayparting and the weekdays it runs
+    on between start and end date. The run dates are only generated when `dates` is
+    first read; `count` needs no materialization at all.
+    """
+    __slots__ = ("start_time", "end_time", "days", "start", "end", "_dates")
+
+    def __init__(self, start_time: str, end_time: str, days: List[str], start: np.datetime64, end: np.datetime64):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.days = days
+        self.start = start
+        self.end = end
+        self._dates = None
+
+    @property
+    def weekmask(self) -> str:
+        return "".join("1" if day in self.days else "0" for day in WEEKDAYS)
+
+    @property
+    def count(self) -> int:
+        return int(np.busday_count(self.start, self.end + 1, weekmask=self.weekmask))
+
+    @property
+    def dates(self) -> List[str]:
+        if self._dates is None:
+            # First run date of each weekday, then every 7th day after it
+            runs = [
+                np.arange(np.busday_offset(self.start, 0, roll='forward', weekmask=weekday_mask(day)), self.end + 1,
+                          7, dtype='datetime64[D]')
+                for day in self.days
+            ]
+            self._dates = np.datetime_as_string(np.sort(np.concatenate(runs))).tolist()
+        return self._dates
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dates": self.dates,
+            "days": self.days,
+            "startTime": self.start_time,
+            "endTime": self.end_time,
+        }
+
+
+def weekday_mask(day: str) -> str:
+    """NumPy weekmask selecting a single GAM weekday."""
+    return "".join("1" if d == day else "0" for d in WEEKDAYS)
+
+
+def expand_daypart_windows(start_date, end_date, day_parts) -> List[DaypartWindow]:
     """
-    Given a date range and dayParts, returns a list of all matching date/time runs.
+    Group dayParts by time window and keep, per window, the weekdays that actually
+    occur between start_date and end_date (inclusive, YYYY-MM-DD).
     """
     if not start_date or not end_date:
         return []
 
-    # Initialize sets to collect unique dates and days
-    unique_dates = set()
-    unique_days = set()
+    start = np.datetime64(start_date, 'D')
+    end = np.datetime64(end_date, 'D')
+    if end < start:
+        return []
 
-    start_date_dt = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
+    # 1970-01-01 was a Thursday; a range of a week or more contains every weekday
+    first_weekday = (int(start.astype(np.int64)) + 3) % 7
+    weekdays_in_range = {WEEKDAYS[(first_weekday + k) % 7] for k in range(min(int((end - start).astype(np.int64)) + 1, 7))}
 
-    current_date = start_date_dt
-    while current_date <= end_date_dt:
-        weekday = calendar.day_name[current_date.weekday()].upper()
+    windows: Dict[Tuple[Tuple[int, int], Tuple[int, int]], set] = {}
+    for dp in day_parts:
+        day = dp.get('dayOfWeek')
+        if day not in WEEKDAYS:
+            continue
+        window = (_daypart_clock(dp.get('startTime', {})), _daypart_clock(dp.get('endTime', {})))
+        windows.setdefault(window, set()).add(day)
 
-        for dp in day_parts:
-            dp_weekday = dp.get('dayOfWeek')
-            if dp_weekday != weekday:
-                continue
-            start_time = dp.get('startTime', {})
-            end_time = dp.get('endTime', {})
-            start_hour = start_time.get('hour', 0)
-            start_minute = GAM_MINUTES.get(start_time.get('minute', 'ZERO'), 0)
-            end_hour = end_time.get('hour', 0)
-            end_minute = GAM_MINUTES.get(end_time.get('minute', 'ZERO'), 0)
-            unique_dates.add(current_date.strftime("%Y-%m-%d"))
-            unique_days.add(dp_weekday)
-
-        current_date += timedelta(days=1)
-
-    dates_list = sorted(list(unique_dates))
-    days_list = sorted(list(unique_days))
-    return [{
-        "dates": dates_list,
-        "days": days_list,
-        "startTime": f"{start_hour:02d}:{start_minute:02d}",
-        "endTime": f"{end_hour:02d}:{end_minute:02d}",
-    }]
+    result = []
+    for ((start_hour, start_minute), (end_hour, end_minute)), days in sorted(windows.items()):
+        running_days = sorted(days & weekdays_in_range)
+        if running_days:
+            result.append(DaypartWindow(
+                f"{start_hour:02d}:{start_minute:02d}", f"{end_hour:02d}:{end_minute:02d}", running_days, start, end,
+            ))
+    return result
+
+
+def expand_daypart_to_dates(start_date, end_date, day_parts):
+    """
+    Given a date range and dayParts, returns one {"dates", "days", "startTime", "endTime"}
+    run per distinct time window.
+    """
+    return [window.to_dict() for window in expand_daypart_windows(start_date, end_date, day_parts)]
 
 #--------------------------------------------------------------------------------------------------
 
@@ -78,6 +149,95 @@ def parse_gam_time(obj) -> Optional[str]:
 
 
 #--------------------------------------------------------------------------------------------------------
+# GAM caps a statement page at 500 results, so an `id IN (...)` list never needs to be longer than that.
+ID_CHUNK_SIZE = 500
+
+
+def gam_service(client, service_name: str) -> InstrumentedService:
+    """`client.GetService` with every call counted in the run's gam_calls{service, method}."""
+    return InstrumentedService(client.GetService(service_name, version='v202411'), service_name)
+
+
+def _chunked(values, size):
+    """Yield successive `size`-long slices of `values`."""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def fetch_names_by_ids(fetch_page, ids, chunk_size: int = ID_CHUNK_SIZE) -> Dict[str, str]:
+    """
+    Resolve GAM entity IDs to names with deduplicated, chunked `WHERE id IN (...)` statements.
+
+    Args:
+        fetch_page (callable): A `get*ByStatement` service method, e.g. `inventory_service.getAdUnitsByStatement`.
+        ids (Iterable[str] or Iterable[int]): IDs to resolve. Duplicates and None are ignored.
+        chunk_size (int): Maximum number of IDs sent in a single statement.
+
+    Returns:
+        Dict[str, str]: Mapping of ID (as a string) to entity name. IDs GAM does not return are absent.
+    """
+    id_to_name = {}
+    for statement in id_statements(ids, chunk_size):
+        add_names(fetch_page(statement), id_to_name)
+    return id_to_name
+
+
+def id_statements(ids, chunk_size: int = ID_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Deduplicated, chunked `WHERE id IN (...)` statements for `ids` (None is ignored)."""
+    unique_ids = list(dict.fromkeys(str(i) for i in ids if i is not None))
+    return [
+        {'query': f"WHERE id IN ({', '.join(chunk)}) LIMIT {chunk_size}", 'values': []}
+        for chunk in _chunked(unique_ids, chunk_size)
+    ]
+
+
+def add_names(response, id_to_name: Dict[str, str]):
+    """Record the {id: name} of every entity in a `get*ByStatement` response."""
+    if 'results' in response:
+        for entity in response['results']:
+            id_to_name[str(entity['id'])] = entity['name']
+
+
+@traced("gam.inventory_names")
+def resolve_inventory_names(client, ad_unit_ids, placement_ids,
+                            mirror: Optional[InventoryMirror] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Resolve every ad unit and placement ID in one pass.
+
+    Callers collect the IDs of a whole result page first, so each distinct ID is
+    looked up once no matter how many line items reference it. Names come from the
+    local inventory mirror (see inventory_mirror.py); only IDs it does not have, or
+    has names older than INVENTORY_MIRROR_MAX_AGE for, are fetched from GAM and stored back.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, str]]: (ad unit ID -> name, placement ID -> name)
+    """
+    mirror = mirror or get_inventory_mirror()
+    ad_unit_names, missing_ad_units = mirror.get_names('Ad_Unit', ad_unit_ids)
+    placement_names, missing_placements = mirror.get_names('Placement', placement_ids)
+    if missing_ad_units:
+        inventory_service = gam_service(client, 'InventoryService')
+        fetched = fetch_names_by_ids(inventory_service.getAdUnitsByStatement, missing_ad_units)
+        mirror.put_names('Ad_Unit', fetched)
+        ad_unit_names.update(fetched)
+    if missing_placements:
+        placement_service = gam_service(client, 'PlacementService')
+        fetched = fetch_names_by_ids(placement_service.getPlacementsByStatement, missing_placements)
+        mirror.put_names('Placement', fetched)
+        placement_names.update(fetched)
+    return ad_unit_names, placement_names
+
+
+def _intern(value):
+    """Intern strings repeated across line items (ad unit, placement and geo names)."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def names_for(ids, id_to_name) -> List[str]:
+    """Map IDs to interned names in input order, dropping IDs that could not be resolved."""
+    return [_intern(id_to_name[str(i)]) for i in ids or [] if str(i) in id_to_name]
+
+
 def get_placement_and_adunit_names_by_id(client, targetedAdUnits, excludedAdUnits, targetedPlacementIds):
     """
     Retrieves the names of ad units and placements from Google Ad Manager
@@ -88,6 +248,10 @@ def get_placement_and_adunit_names_by_id(client, targetedAdUnits, excludedAdUnit
       - Names of excluded ad units
       - Names of targeted placements
 
+    Names are read from the local inventory mirror first. Targeted and excluded ad
+    units that it lacks are resolved together, so at most one InventoryService and
+    one PlacementService query is sent per 500 distinct missing IDs.
+
     Args:
         client (ad_manager.AdManagerClient): The authenticated Google Ad Manager API client.
         targetedAdUnits (List[str] or List[int]): List of ad unit IDs to be targeted.
@@ -108,49 +272,79 @@ def get_placement_and_adunit_names_by_id(client, targetedAdUnits, excludedAdUnit
             'targetedPlacements': ['News Section Placement']
         }
     """
-    inventory_service = client.GetService('InventoryService', version='v202411')
-    placement_service = client.GetService('PlacementService', version='v202411')
-
-    def fetch_ad_unit_names(ids):
-        if not ids:
-            return []
-        id_list = ', '.join(str(i) for i in ids)
-        statement = {
-            'query': f'WHERE id IN ({id_list})',
-            'values': []
-        }
-        response = inventory_service.getAdUnitsByStatement(statement)
-        names = []
-        if 'results' in response:
-            for ad_unit in response['results']:
-                names.append(ad_unit['name'])
-        return names
-
-    def fetch_placement_names(ids):
-        if not ids:
-            return []
-        id_list = ', '.join(str(i) for i in ids)
-        statement = {
-            'query': f'WHERE id IN ({id_list})',
-            'values': []
-        }
-        response = placement_service.getPlacementsByStatement(statement)
-        names = []
-        if 'results' in response:
-            for placement in response['results']:
-                names.append(placement['name'])
-        return names
-  
+    ad_unit_names, placement_names = resolve_inventory_names(
+        client,
+        ad_unit_ids=list(targetedAdUnits or []) + list(excludedAdUnits or []),
+        placement_ids=targetedPlacementIds or [],
+    )
     return {
-        'targetedAdUnits': fetch_ad_unit_names(targetedAdUnits),
-        'excludedAdUnits': fetch_ad_unit_names(excludedAdUnits),
-        'targetedPlacements': fetch_placement_names(targetedPlacementIds)
+        'targetedAdUnits': names_for(targetedAdUnits, ad_unit_names),
+        'excludedAdUnits': names_for(excludedAdUnits, ad_unit_names),
+        'targetedPlacements': names_for(targetedPlacementIds, placement_names)
     }
 
+@traced("gam.custom_targeting")
+def fetch_custom_targeting_names(client, key_ids, value_pairs, cache: Optional[TargetingCache] = None):
+    """
+    Resolve custom targeting key and value names through the on-disk targeting cache.
+
+    Only cache misses reach GAM, and they are fetched in bulk: one
+    `getCustomTargetingKeysByStatement` and one `getCustomTargetingValuesByStatement`
+    per 500 missing IDs, regardless of how many audience nodes referenced them.
+
+    Args:
+        client (AdManagerClient): An authenticated AdManager client.
+        key_ids (Iterable[int]): Custom targeting key IDs.
+        value_pairs (Iterable[Tuple[int, int]]): (key_id, value_id) pairs.
+        cache (TargetingCache, optional): Defaults to the process-wide cache.
+
+    Returns:
+        Tuple[Dict[int, str], Dict[Tuple[int, int], str]]: key names and value names, None for IDs GAM does not know.
+    """
+    cache = cache or get_targeting_cache()
+    key_names, missing_keys = cache.get_keys(key_ids)
+    value_names, missing_values = cache.get_values(value_pairs)
+    if not missing_keys and not missing_values:
+        return key_names, value_names
+
+    custom_targeting_service = gam_service(client, 'CustomTargetingService')
+
+    if missing_keys:
+        fetched = fetch_names_by_ids(custom_targeting_service.getCustomTargetingKeysByStatement, missing_keys)
+        fetched = {k: fetched.get(str(k)) for k in missing_keys}
+        cache.put_keys(fetched)
+        key_names.update(fetched)
+
+    fetched_values = dict.fromkeys(missing_values)
+    for statement in value_statements(missing_values):
+        add_value_names(custom_targeting_service.getCustomTargetingValuesByStatement(statement), fetched_values)
+    cache.put_values(fetched_values)
+    value_names.update(fetched_values)
+    return key_names, value_names
+
+def value_statements(value_pairs) -> List[Dict[str, Any]]:
+    """Chunked `customTargetingKeyId IN (...) AND id IN (...)` statements for (key_id, value_id) pairs."""
+    statements = []
+    for chunk in _chunked(value_pairs, ID_CHUNK_SIZE):
+        key_id_str = ', '.join(str(k) for k in dict.fromkeys(k for k, _ in chunk))
+        value_id_str = ', '.join(str(v) for _, v in chunk)
+        statements.append({
+            'query': f'WHERE customTargetingKeyId IN ({key_id_str}) AND id IN ({value_id_str}) LIMIT {ID_CHUNK_SIZE}',
+            'values': []
+        })
+    return statements
+
+def add_value_names(response, value_names: Dict[Tuple[int, int], Optional[str]]):
+    """Record the {(key_id, value_id): name} of every value in a `getCustomTargetingValuesByStatement` response."""
+    if 'results' in response:
+        for item in response['results']:
+            pair = (int(getattr(item, 'customTargetingKeyId')), int(getattr(item, 'id')))
+            value_names[pair] = getattr(item, 'name')
+
 def get_key_name(client,key_id):
     """
     Retrieves the name of a custom targeting key from Google Ad Manager
-    using the provided key ID.
+    using the provided key ID. Served from the targeting cache when possible.
 
     Args:
         key_id (int): The custom targeting key ID (e.g., representing "Interest", "Location", etc.).
@@ -163,22 +357,14 @@ def get_key_name(client,key_id):
         >>> get_key_name(14348657)
         'User_Interest'
     """
-    custom_targeting_service = client.GetService('CustomTargetingService', version='v202411')
-    stmt = (ad_manager.StatementBuilder()
-            .Where('id = :id')
-            .WithBindVariable('id', key_id)
-            .Limit(1))
-    
-    response = custom_targeting_service.getCustomTargetingKeysByStatement(stmt.ToStatement())
-    
-    if 'results' in response and len(response['results']) > 0:
-        return response['results'][0]['name']
-    return f"Unknown_Key_{key_id}"
+    key_names, _ = fetch_custom_targeting_names(client, [key_id], [])
+    return key_names.get(int(key_id)) or f"Unknown_Key_{key_id}"
 
 def get_value_names(client , key_id, value_ids):
     """
     Fetches the names of custom targeting values from Google Ad Manager 
     for a given custom targeting key ID and a list of value IDs.
+    Served from the targeting cache when possible.
 
     Args:
         key_id (int): The custom targeting key ID (e.g., for "Interest", "Location", etc.).
@@ -192,232 +378,615 @@ def get_value_names(client , key_id, value_ids):
         >>> get_value_names(14348657, [449054745733, 449054745883])
         ['o2c', '66c']
     """
-    custom_targeting_service = client.GetService('CustomTargetingService', version='v202411')
-    value_id_str = ', '.join(map(str, value_ids))
-    
-    stmt = (ad_manager.StatementBuilder()
-            .Where(f'customTargetingKeyId = :key_id AND id IN ({value_id_str})')
-            .WithBindVariable('key_id', key_id)
-            .Limit(500))
+    _, value_names = fetch_custom_targeting_names(client, [], [(key_id, v) for v in value_ids or []])
+    return [value_names.get((int(key_id), int(v_id))) or f"Unknown_Value_{v_id}" for v_id in value_ids or []]
+
+def build_audience(audience_data, key_names, value_names) -> List[Dict[str, Any]]:
+    """Turn raw audience nodes into {'key_name', 'value_names', 'operator'} dicts using resolved names."""
+    transformed_audience = []
+    for audience in audience_data:
+        key_id = audience['key_id']
+        key_name = key_names.get(int(key_id)) if key_id is not None else None
+        transformed_audience.append({
+            'key_name': key_name or f"Unknown_Key_{key_id}",
+            'value_names': [
+                value_names.get((int(key_id), int(v_id))) or f"Unknown_Value_{v_id}"
+                for v_id in audience['value_id'] or []
+            ],
+            'operator': audience['operator']
+        })
+    return transformed_audience
 
-    response = custom_targeting_service.getCustomTargetingValuesByStatement(stmt.ToStatement())
+def wants(fields: Optional[Collection[str]], field: str) -> bool:
+    """Whether `field` was requested; `fields=None` means every field."""
+    return fields is None or field in fields
 
-    value_id_to_name = {}
 
-    if 'results' in response:
-        for item in response['results']:
-            value_id_to_name[getattr(item, 'id')] = getattr(item, 'name')
-    return [value_id_to_name.get(v_id, f"Unknown_Value_{v_id}") for v_id in value_ids]
+@dataclass(frozen=True, slots=True)
+class LineItemRecord:
+    """
+    QC details of one GAM line item.
+
+    Slotted and immutable: an order can expand to hundreds of line items that each
+    target thousands of ad units, and the record holds nothing but tuples of interned
+    names, never the SOAP objects it was built from. `day_parting_dates` holds lazy
+    DaypartWindows; their run dates are only generated by `to_dict`, which gives the JSON shape.
+    """
+    name: str = ""
+    status: Optional[str] = None
+    geo: Tuple[str, ...] = ()
+    excluded_geo: Tuple[str, ...] = ()
+    currency_code: Optional[str] = None
+    total_amt: Optional[float] = None
+    fcap: Optional[int] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    goal: Optional[int] = None
+    creative_size: Tuple[str, ...] = ()
+    priority: Optional[int] = None
+    targetedAdUnits: Tuple[str, ...] = ()
+    excludedAdUnits: Tuple[str, ...] = ()
+    targetedPlacement: Tuple[str, ...] = ()
+    audience: Tuple[Dict[str, Any], ...] = ()
+    day_parting_dates: Tuple[Union[DaypartWindow, Dict[str, Any]], ...] = ()
+    cpd_daily_rate: Optional[float] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record as the detail dict written to JSON, tuples as lists and daypart windows with their dates."""
+        return {
+            f.name: [v.to_dict() if isinstance(v, DaypartWindow) else v for v in value] if isinstance(value, tuple) else value
+            for f in dataclass_fields(self)
+            for value in (getattr(self, f.name),)
+        }
+
+def extract_line_item_details(client, item, fields: Optional[Collection[str]] = None) -> Tuple[LineItemRecord, Dict[str, List]]:
+    """
+    Convert one GAM LineItem into a LineItemRecord.
+
+    Ad unit, placement and custom targeting names are left empty here; the raw IDs
+    are returned alongside so the caller can resolve a whole page of line items at once.
+    Dayparts are only grouped into DaypartWindows when `day_parting_dates` is in `fields`;
+    their dates are not generated here.
+
+    Returns:
+        Tuple[LineItemRecord, Dict]: (line item record, {"targetedAdUnits"/"excludedAdUnits"/"targetedPlacement": IDs,
+                           "audience": raw audience nodes})
+    """
+    name = getattr(item, 'name', '')
+    status = getattr(item, 'status', None)
+
+    geo = []
+    excluded_geo = []
+    daily_rate_amt = None
+    costperunit = getattr(item , "costPerUnit", None)
+    
+    if costperunit:
+        daily_rate = getattr(costperunit, "microAmount", None)
+        daily_rate_amt = daily_rate / 1_000_000 if daily_rate else 0
+    targeting = getattr(item, 'targeting', None)
+    if targeting:
+        geo_targeting = getattr(targeting, 'geoTargeting', None)
+        if geo_targeting:
+            targeted_locations = getattr(geo_targeting, 'targetedLocations', [])
+            excluded_locations = getattr(geo_targeting,"excludedLocations", None)
+            geo = [_intern(getattr(loc, 'displayName', 'Unknown')) for loc in targeted_locations or []]
+            excluded_geo = [_intern(getattr(loc, 'displayName', 'Unknown')) for loc in excluded_locations or []]
+
+    creative_sizes = []
+    creatives = getattr(item, "creativePlaceholders", None)
+    if creatives:
+        for creative in creatives:
+            targeting_name = getattr(creative, "targetingName", None)
+            if targeting_name:
+                creative_sizes.append(_intern(targeting_name))
+
+    line_goal = None
+    goal = getattr(item,"primaryGoal", None)
+    if goal:
+        line_goal = getattr(goal,"units", None)
+        
+    budget_info = getattr(item, 'budget', None)
+
+    priority = getattr(item,"priority",None)
+    line_budget = None
+    currency_code = None
+    if budget_info:
+        currency_code = getattr(budget_info, 'currencyCode', None)
+        micro_amount = getattr(budget_info, 'microAmount', 0)
+        line_budget = micro_amount / 1_000_000 if micro_amount else 0
+
+    # Dates
+    start_date = parse_gam_date(getattr(item, 'startDateTime', None))
+    end_date = parse_gam_date(getattr(item, 'endDateTime', None))
+    line_start_time = parse_gam_time(getattr(item, 'startDateTime', None))
+    end_start_time = parse_gam_time(getattr(item, 'endDateTime', None))
+    
+    
+    inventory_targeting = getattr(targeting, "inventoryTargeting", None)
+    targeted_ad_unit_ids = []
+    excluded_ad_unit_ids = []
+    targeted_placement_ids = []
+    
+    if inventory_targeting:
+        # Extract targetedAdUnits
+        targeted_ad_units = getattr(inventory_targeting, "targetedAdUnits", [])
+        if targeted_ad_units:
+            targeted_ad_unit_ids = [
+                getattr(ad_unit, "adUnitId") for ad_unit in targeted_ad_units if hasattr(ad_unit, "adUnitId")
+            ]
+
+        # Extract excludedAdUnits
+        excluded_ad_units = getattr(inventory_targeting, "excludedAdUnits", [])
+        if excluded_ad_units:
+            excluded_ad_unit_ids = [
+                getattr(ad_unit, "adUnitId") for ad_unit in excluded_ad_units if hasattr(ad_unit, "adUnitId")
+            ]
+
+        # Extract targetedPlacementIds (it's a list of strings)
+        targeted_placement_ids = getattr(inventory_targeting, "targetedPlacementIds")
+        
+    fcap = None
+    frequencyCaps = getattr(item, "frequencyCaps", None)
+    if frequencyCaps:
+        for caps in frequencyCaps:
+            fcap = getattr(caps,"maxImpressions", None)
+
+    audience_data = []
+    customTargeting = getattr(targeting,"customTargeting",None)
+    children = getattr(customTargeting, "children",None)
+    if children:
+        for child in children:
+            child_nodes = getattr(child, "children", None)
+            if child_nodes:
+                #logger.info("audience nodes exists")
+                for nodes in child_nodes:
+                    key_id = getattr(nodes, "keyId", None)
+                    value_id = getattr(nodes,"valueIds", None)
+                    operator = getattr(nodes, "operator", None)
+                    audience_data.append(
+                        {
+                            "key_id":key_id,
+                            "value_id":value_id,
+                            "operator":operator,
+                        }
+                    )
+
+    daypart_windows = []
+
+    daypart_targeting = getattr(targeting, 'dayPartTargeting', None)
+    parsed_day_parts = []
+ 
+    if daypart_targeting:
+        day_parts_raw = getattr(daypart_targeting, 'dayParts', [])
+        
+        for dp in day_parts_raw:
+            day_of_week = getattr(dp, 'dayOfWeek', None)
+            start_time = getattr(dp, 'startTime', {})
+            end_time = getattr(dp, 'endTime', {})
+
+            parsed_day_parts.append({
+                'dayOfWeek': day_of_week,
+                'startTime': {
+                    'hour': getattr(start_time, 'hour', 0),
+                    'minute': getattr(start_time, 'minute', 'ZERO')
+                },
+                'endTime': {
+                    'hour': getattr(end_time, 'hour', 0),
+                    'minute': getattr(end_time, 'minute', 'ZERO')
+                }
+            })
+  
+    if parsed_day_parts and wants(fields, "day_parting_dates"):
+        daypart_windows = expand_daypart_windows(start_date, end_date, parsed_day_parts)
+    
+    details = LineItemRecord(
+        name=name,
+        status=_intern(status),
+        geo=tuple(geo),
+        excluded_geo=tuple(excluded_geo),
+        currency_code=_intern(currency_code),
+        total_amt=line_budget,
+        fcap=fcap,
+        start_date=start_date,
+        end_date=end_date,
+        goal=line_goal,
+        creative_size=tuple(creative_sizes),
+        priority=priority,
+        day_parting_dates=tuple(daypart_windows) if daypart_windows else ((
+            {"date": "Runs on single day"},) if wants(fields, "day_parting_dates") else ()),
+        cpd_daily_rate=daily_rate_amt,
+        start_time=line_start_time if line_start_time else "00:00:00",
+        end_time=end_start_time,
+    )
+    refs = {
+        "targetedAdUnits": targeted_ad_unit_ids,
+        "excludedAdUnits": excluded_ad_unit_ids,
+        "targetedPlacement": targeted_placement_ids or [],
+        "audience": audience_data,
+    }
+    return details, refs
+
 
 #---------------------------------------------------------------------------------------------------------------------------------------------
 #                                    Fetch Line Item Details by Name
 #---------------------------------------------------------------------------------------------------------------------------------------------
 #client = ad_manager.AdManagerClient.LoadFromStorage(NEW_GAM)
-def get_line_items_details_by_name(client, line_item_name: str) -> List[Dict[str, Any]]:
+def resolve_line_item_page(client, items, fields: Optional[Collection[str]] = None) -> List[LineItemRecord]:
     """
-    Fetch line items from Google Ad Manager matching a given line item name substring.
+    Convert one page of GAM LineItems into LineItemRecords, resolving every ad unit,
+    placement and custom targeting ID on the page in one go instead of per line item.
+
+    With `fields`, only the sub-resources those fields need are looked up: ad unit names
+    for targetedAdUnits/excludedAdUnits, placement names for targetedPlacement and custom
+    targeting names for audience. Fields that were not requested are left empty.
+    """
+    return resolve_parsed_page(client, parse_line_item_page(client, items, fields), fields)
+
+@traced("gam.parse_line_items")
+def parse_line_item_page(client, items, fields: Optional[Collection[str]] = None) -> List[Tuple[LineItemRecord, Dict[str, List]]]:
+    """(record, raw IDs) of every LineItem on a page; afterwards the SOAP objects are no longer needed."""
+    return [extract_line_item_details(client, item, fields) for item in items]
+
+def resolve_parsed_page(client, parsed, fields: Optional[Collection[str]] = None) -> List[LineItemRecord]:
+    """Look up the names a parsed page references and fill them into its records."""
+    ad_unit_ids, placement_ids, key_ids, value_pairs = collect_page_refs(parsed, fields)
+    ad_unit_names, placement_names = resolve_inventory_names(client, ad_unit_ids, placement_ids)
+    key_names, value_names = fetch_custom_targeting_names(client, key_ids, value_pairs) if key_ids else ({}, {})
+    return apply_page_names(parsed, fields, ad_unit_names, placement_names, key_names, value_names)
+
+def collect_page_refs(parsed, fields: Optional[Collection[str]] = None) -> Tuple[List, List, List, List]:
+    """(ad unit IDs, placement IDs, key IDs, (key_id, value_id) pairs) the requested fields of a parsed page reference."""
+    ad_unit_ids, placement_ids = [], []
+    key_ids, value_pairs = [], []
+    for _, ids in parsed:
+        if wants(fields, "targetedAdUnits"):
+            ad_unit_ids.extend(ids["targetedAdUnits"])
+        if wants(fields, "excludedAdUnits"):
+            ad_unit_ids.extend(ids["excludedAdUnits"])
+        if wants(fields, "targetedPlacement"):
+            placement_ids.extend(ids["targetedPlacement"])
+        if not wants(fields, "audience"):
+            continue
+        for audience in ids["audience"]:
+            if audience["key_id"] is None:
+                continue
+            key_ids.append(audience["key_id"])
+            value_pairs.extend((audience["key_id"], v) for v in audience["value_id"] or [])
+    return ad_unit_ids, placement_ids, key_ids, value_pairs
+
+def apply_page_names(parsed, fields, ad_unit_names, placement_names, key_names, value_names) -> List[LineItemRecord]:
+    """Records of a parsed page with their name fields filled from the resolved lookups."""
+    page_details = []
+    for details, ids in parsed:
+        names = {}
+        if wants(fields, "targetedAdUnits"):
+            names["targetedAdUnits"] = tuple(names_for(ids["targetedAdUnits"], ad_unit_names))
+        if wants(fields, "excludedAdUnits"):
+            names["excludedAdUnits"] = tuple(names_for(ids["excludedAdUnits"], ad_unit_names))
+        if wants(fields, "targetedPlacement"):
+            names["targetedPlacement"] = tuple(names_for(ids["targetedPlacement"], placement_names))
+        if wants(fields, "audience"):
+            names["audience"] = tuple(build_audience(ids["audience"], key_names, value_names))
+        page_details.append(replace(details, **names))
+    return page_details
+
+def line_item_statement(line_item_name: str, page_size: int = LINE_ITEM_PAGE_SIZE):
+    """StatementBuilder for line items whose name contains `line_item_name`, `page_size` per page."""
+    return (ad_manager.StatementBuilder(version='v202411', limit=page_size)
+            .Where('name LIKE :name')
+            .WithBindVariable('name', f'%{line_item_name}%'))
+
+def iter_line_item_pages(client, line_item_name: str, page_size: int = LINE_ITEM_PAGE_SIZE,
+                         fields: Optional[Collection[str]] = None) -> Iterator[List[LineItemRecord]]:
+    """
+    Page through line items whose name contains `line_item_name`, yielding the
+    LineItemRecords of one page at a time, so a comparison can start on the first page.
+
+    Runs `iter_line_item_pages_async` on a private event loop: the name lookups of a page
+    run concurrently, and the next page is already being fetched while the consumer works
+    on the current one. Called from inside a running event loop, where another loop can't
+    run, it pages sequentially with `iter_line_item_pages_sequential` instead.
 
     Args:
         client (AdManagerClient): An authenticated AdManager client.
         line_item_name (str): Partial or full line item name to search.
+        page_size (int): Line items requested per `getLineItemsByStatement` call (GAM allows at most 500).
+        fields (Collection[str], optional): Detail fields the caller needs; see `resolve_line_item_page`.
+            None resolves everything.
 
     Returns:
-        List[Dict]: A list of matching line item details.
+        Iterator[List[LineItemRecord]]: Line item details one page at a time. Pages with no matching
+        line items are skipped; a page after the first that fails to download raises RuntimeError.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run_line_item_pages(client, line_item_name, page_size, fields)
+    return iter_line_item_pages_sequential(client, line_item_name, page_size, fields)
+
+
+def _run_line_item_pages(client, line_item_name: str, page_size: int,
+                         fields: Optional[Collection[str]]) -> Iterator[List[LineItemRecord]]:
+    """Drive `iter_line_item_pages_async` one page per `next()` on an event loop of its own."""
+    loop = asyncio.new_event_loop()
+    gam = GamCaller(client)
+    pages = iter_line_item_pages_async(gam, line_item_name, page_size, fields)
+    try:
+        while True:
+            try:
+                page = loop.run_until_complete(pages.__anext__())
+            except StopAsyncIteration:
+                return
+            yield page
+    finally:
+        # Also runs when the consumer stops early: cancel the prefetched page, like asyncio.run
+        try:
+            loop.run_until_complete(pages.aclose())
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            gam.close()
+            loop.close()
+
+
+def iter_line_item_pages_sequential(client, line_item_name: str, page_size: int = LINE_ITEM_PAGE_SIZE,
+                                    fields: Optional[Collection[str]] = None) -> Iterator[List[LineItemRecord]]:
+    """
+    `iter_line_item_pages` with one SOAP request at a time, for callers inside a running event loop.
+
+    The next page is only requested once the consumer asks for it. Each SOAP response is
+    released as soon as its line items are converted, before their names are looked up.
+
+    A failure on the first page is logged and yields nothing. A failure on a later page
+    raises RuntimeError, since stopping there would pass a truncated set of line items off
+    as the complete result.
     """
     if not line_item_name or not isinstance(line_item_name, str):
-        #logger.warning("Invalid line_item_name provided.")
-        return []
+        logger.warning("Invalid line_item_name provided.")
+        return
+
+    line_item_service = gam_service(client, 'LineItemService')
+    statement = line_item_statement(line_item_name, page_size)
+
+    while True:
+        try:
+            with span("gam.line_items", offset=statement.offset):
+                response = line_item_service.getLineItemsByStatement(statement.ToStatement())
+        except Exception as e:
+            if statement.offset == 0:
+                logger.exception(f"Failed to fetch line items from GAM: {e}")
+                return
+            raise RuntimeError(f"Failed to fetch line items from GAM after the first {statement.offset} line items: {e}") from e
+
+        results = getattr(response, 'results', None) or []
+        last_page = len(results) < page_size
+        parsed = parse_line_item_page(
+            client, [item for item in results if line_item_name in getattr(item, 'name', '')], fields
+        )
+        # Only the converted records are kept while the page's names are looked up
+        del response, results
+        if parsed:
+            yield resolve_parsed_page(client, parsed, fields)
+
+        if last_page:
+            return
+        statement.offset += page_size
+
+def iter_line_items_details_by_name(client, line_item_name: str, page_size: int = LINE_ITEM_PAGE_SIZE,
+                                    fields: Optional[Collection[str]] = None) -> Iterator[LineItemRecord]:
+    """Stream matching line item details one record at a time; see `iter_line_item_pages`."""
+    for page in iter_line_item_pages(client, line_item_name, page_size=page_size, fields=fields):
+        yield from page
+
+def get_line_items_details_by_name(client, line_item_name: str, fields: Optional[Collection[str]] = None) -> List[LineItemRecord]:
+    """
+    Fetch line items from Google Ad Manager matching a given line item name substring.
 
-    try:
-        line_item_service = client.GetService('LineItemService', version='v202411')
-        statement = ad_manager.StatementBuilder(version='v202411').Where(f"name LIKE '%{line_item_name}%'")
-        response = line_item_service.getLineItemsByStatement(statement.ToStatement())
-    except Exception as e:
-        #logger.exception(f"Failed to fetch line items from GAM: {e}")
-        return []
+    Pages through `iter_line_item_pages`, so the name lookups of a page run concurrently
+    and the next page is fetched while the current one is resolved. When called from
+    inside a running event loop it falls back to the sequential fetch.
 
-    results = getattr(response, 'results', [])
+    Args:
+        client (AdManagerClient): An authenticated AdManager client.
+        line_item_name (str): Partial or full line item name to search.
+        fields (Collection[str], optional): Only resolve the sub-resources these fields need,
+            e.g. `qc_checks.required_gam_fields(checks)`. None resolves everything.
 
-    if not results:
-        #logger.info(f"No matching line items found for: {line_item_name}")
-        return []
+    Returns:
+        List[LineItemRecord]: Matching line item details across all result pages; `to_dict()` gives the JSON shape.
+    """
+    return list(iter_line_items_details_by_name(client, line_item_name, fields=fields))
 
-    all_line_item_details = []
+#---------------------------------------------------------------------------------------------------------------------------------------------
+#                                    Async Fetch
+#---------------------------------------------------------------------------------------------------------------------------------------------
+# SOAP requests in flight at once across the process; keeps a QC run (batch_qc fetches
+# several line items in parallel) inside the network's API quota
+GAM_MAX_IN_FLIGHT = int(os.getenv("GAM_MAX_IN_FLIGHT", 8))
+_gam_slots = threading.BoundedSemaphore(GAM_MAX_IN_FLIGHT)
 
-    for item in results:
-        name = getattr(item, 'name', '')
-        if line_item_name not in name:
-            continue
 
-        status = getattr(item, 'status', None)
+class GamCaller:
+    """
+    Runs blocking googleads SOAP calls on a thread pool for asyncio code.
 
-        geo = []
-        excluded_geo = []
-        costperunit = getattr(item , "costPerUnit", None)
-        
-        if costperunit:
-            daily_rate = getattr(costperunit, "microAmount", None)
-            daily_rate_amt = daily_rate / 1_000_000 if daily_rate else 0
-        targeting = getattr(item, 'targeting', None)
-        if targeting:
-            geo_targeting = getattr(targeting, 'geoTargeting', None)
-            if geo_targeting:
-                targeted_locations = getattr(geo_targeting, 'targetedLocations', [])
-                excluded_locations = getattr(geo_targeting,"excludedLocations", None)
-                geo = [getattr(loc, 'displayName', 'Unknown') for loc in targeted_locations or []]
-                excluded_geo = [getattr(loc, 'displayName', 'Unknown') for loc in excluded_locations or []]
-
-        creative_sizes = []
-        creatives = getattr(item, "creativePlaceholders", None)
-        if creatives:
-            for creative in creatives:
-                targeting_name = getattr(creative, "targetingName", None)
-                if targeting_name:
-                    creative_sizes.append(targeting_name)
-
-        goal = getattr(item,"primaryGoal", None)
-        if goal:
-            line_goal = getattr(goal,"units", None)
-            
-        budget_info = getattr(item, 'budget', None)
-
-        priority = getattr(item,"priority",None)
-        line_budget = None
-        currency_code = None
-        if budget_info:
-            currency_code = getattr(budget_info, 'currencyCode', None)
-            micro_amount = getattr(budget_info, 'microAmount', 0)
-            line_budget = micro_amount / 1_000_000 if micro_amount else 0
-
-        # Dates
-        start_date = parse_gam_date(getattr(item, 'startDateTime', None))
-        end_date = parse_gam_date(getattr(item, 'endDateTime', None))
-        line_start_time = parse_gam_time(getattr(item, 'startDateTime', None))
-        end_start_time = parse_gam_time(getattr(item, 'endDateTime', None))
-        
-        
-        inventory_targeting = getattr(targeting, "inventoryTargeting", None)
-        targeted_ad_unit_ids = []
-        excluded_ad_unit_ids = []
-        targeted_placement_ids = []
-        
-        if inventory_targeting:
-            # Extract targetedAdUnits
-            targeted_ad_units = getattr(inventory_targeting, "targetedAdUnits", [])
-            if targeted_ad_units:
-                targeted_ad_unit_ids = [
-                    getattr(ad_unit, "adUnitId") for ad_unit in targeted_ad_units if hasattr(ad_unit, "adUnitId")
-                ]
-
-            # Extract excludedAdUnits
-            excluded_ad_units = getattr(inventory_targeting, "excludedAdUnits", [])
-            if excluded_ad_units:
-                excluded_ad_unit_ids = [
-                    getattr(ad_unit, "adUnitId") for ad_unit in excluded_ad_units if hasattr(ad_unit, "adUnitId")
-                ]
-
-            # Extract targetedPlacementIds (it's a list of strings)
-            targeted_placement_ids = getattr(inventory_targeting, "targetedPlacementIds")
-            
-        names = get_placement_and_adunit_names_by_id(
-            client, 
-            targetedAdUnits=targeted_ad_unit_ids, 
-            excludedAdUnits=excluded_ad_unit_ids, 
-            targetedPlacementIds=targeted_placement_ids
+    At most `max_in_flight` requests of this caller run at once (an asyncio.Semaphore),
+    and at most GAM_MAX_IN_FLIGHT across every caller in the process. Each worker thread
+    gets its own service objects, since zeep services are not shared across threads.
+    Create one per event loop.
+    """
+
+    def __init__(self, client, max_in_flight: int = GAM_MAX_IN_FLIGHT):
+        self.client = client
+        self.calls = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gam")
+        self._local = threading.local()
+
+    def _invoke(self, service_name: str, method: str, statement):
+        services = self._local.__dict__.setdefault("services", {})
+        if service_name not in services:
+            services[service_name] = gam_service(self.client, service_name)
+        with _gam_slots:
+            return getattr(services[service_name], method)(statement)
+
+    async def call(self, service_name: str, method: str, statement):
+        async with self._semaphore:
+            self.calls += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._invoke, service_name, method, statement)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+async def fetch_names_by_ids_async(gam: GamCaller, service_name: str, method: str, ids) -> Dict[str, str]:
+    """`fetch_names_by_ids` with every chunk requested concurrently."""
+    responses = await asyncio.gather(*(gam.call(service_name, method, s) for s in id_statements(ids)))
+    id_to_name = {}
+    for response in responses:
+        add_names(response, id_to_name)
+    return id_to_name
+
+
+@traced("gam.inventory_names")
+async def resolve_inventory_names_async(gam: GamCaller, ad_unit_ids, placement_ids,
+                                        mirror: Optional[InventoryMirror] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """`resolve_inventory_names` with the ad unit and placement mirror misses fetched concurrently."""
+    mirror = mirror or get_inventory_mirror()
+    ad_unit_names, missing_ad_units = mirror.get_names('Ad_Unit', ad_unit_ids)
+    placement_names, missing_placements = mirror.get_names('Placement', placement_ids)
+    fetched_ad_units, fetched_placements = await asyncio.gather(
+        fetch_names_by_ids_async(gam, 'InventoryService', 'getAdUnitsByStatement', missing_ad_units),
+        fetch_names_by_ids_async(gam, 'PlacementService', 'getPlacementsByStatement', missing_placements),
+    )
+    for pql_table, names, fetched in (('Ad_Unit', ad_unit_names, fetched_ad_units),
+                                      ('Placement', placement_names, fetched_placements)):
+        if fetched:
+            mirror.put_names(pql_table, fetched)
+            names.update(fetched)
+    return ad_unit_names, placement_names
+
+
+@traced("gam.custom_targeting")
+async def fetch_custom_targeting_names_async(gam: GamCaller, key_ids, value_pairs, cache: Optional[TargetingCache] = None):
+    """`fetch_custom_targeting_names` with the key and value lookups for cache misses running concurrently."""
+    cache = cache or get_targeting_cache()
+    key_names, missing_keys = cache.get_keys(key_ids)
+    value_names, missing_values = cache.get_values(value_pairs)
+    if not missing_keys and not missing_values:
+        return key_names, value_names
+
+    fetched_keys, value_responses = await asyncio.gather(
+        fetch_names_by_ids_async(gam, 'CustomTargetingService', 'getCustomTargetingKeysByStatement', missing_keys),
+        asyncio.gather(*(
+            gam.call('CustomTargetingService', 'getCustomTargetingValuesByStatement', s)
+            for s in value_statements(missing_values)
+        )),
+    )
+    if missing_keys:
+        fetched_keys = {k: fetched_keys.get(str(k)) for k in missing_keys}
+        cache.put_keys(fetched_keys)
+        key_names.update(fetched_keys)
+
+    fetched_values = dict.fromkeys(missing_values)
+    for response in value_responses:
+        add_value_names(response, fetched_values)
+    cache.put_values(fetched_values)
+    value_names.update(fetched_values)
+    return key_names, value_names
+
+
+async def resolve_line_item_page_async(gam: GamCaller, items, fields: Optional[Collection[str]] = None) -> List[LineItemRecord]:
+    """`resolve_line_item_page` with the inventory and custom targeting lookups running concurrently."""
+    return await resolve_parsed_page_async(gam, parse_line_item_page(gam.client, items, fields), fields)
+
+
+async def resolve_parsed_page_async(gam: GamCaller, parsed, fields: Optional[Collection[str]] = None) -> List[LineItemRecord]:
+    """`resolve_parsed_page` with the inventory and custom targeting lookups running concurrently."""
+    ad_unit_ids, placement_ids, key_ids, value_pairs = collect_page_refs(parsed, fields)
+    (ad_unit_names, placement_names), (key_names, value_names) = await asyncio.gather(
+        resolve_inventory_names_async(gam, ad_unit_ids, placement_ids),
+        fetch_custom_targeting_names_async(gam, key_ids, value_pairs),
+    )
+    return apply_page_names(parsed, fields, ad_unit_names, placement_names, key_names, value_names)
+
+
+async def iter_line_item_pages_async(gam: GamCaller, line_item_name: str, page_size: int = LINE_ITEM_PAGE_SIZE,
+                                     fields: Optional[Collection[str]] = None) -> AsyncIterator[List[LineItemRecord]]:
+    """
+    Async `iter_line_item_pages`: while one page's names are being resolved, the next
+    page of line items is already being fetched.
+    """
+    if not line_item_name or not isinstance(line_item_name, str):
+        logger.warning("Invalid line_item_name provided.")
+        return
+
+    statement = line_item_statement(line_item_name, page_size)
+    offset = 0
+
+    def fetch_page():
+        page = asyncio.ensure_future(gam.call('LineItemService', 'getLineItemsByStatement', statement.ToStatement()))
+        statement.offset += page_size
+        return page
+
+    next_page = fetch_page()
+    while next_page is not None:
+        try:
+            # Only the wait for the prefetched page; it was requested while the last one resolved
+            with span("gam.line_items"):
+                response = await next_page
+        except Exception as e:
+            # As in iter_line_item_pages_sequential: only a failed first page may end the fetch quietly
+            if offset == 0:
+                logger.exception(f"Failed to fetch line items from GAM: {e}")
+                return
+            raise RuntimeError(f"Failed to fetch line items from GAM after the first {offset} line items: {e}") from e
+
+        results = getattr(response, 'results', None) or []
+        offset += page_size
+        next_page = fetch_page() if len(results) == page_size else None
+
+        parsed = parse_line_item_page(
+            gam.client, [item for item in results if line_item_name in getattr(item, 'name', '')], fields
         )
-        # Safely extract names from the returned dict
-        targeted_ad_units_name = names.get('targetedAdUnits', [])
-        excluded_ad_units_name = names.get('excludedAdUnits', [])
-        targeted_placement_names = names.get('targetedPlacements', [])
-        fcap = None
-        frequencyCaps = getattr(item, "frequencyCaps", None)
-        if frequencyCaps:
-            for caps in frequencyCaps:
-                fcap = getattr(caps,"maxImpressions", None)
-
-        audience_data = []
-        customTargeting = getattr(targeting,"customTargeting",None)
-        children = getattr(customTargeting, "children",None)
-        if children:
-            for child in children:
-                child_nodes = getattr(child, "children", None)
-                if child_nodes:
-                    #logger.info("audience nodes exists")
-                    for nodes in child_nodes:
-                        key_id = getattr(nodes, "keyId", None)
-                        value_id = getattr(nodes,"valueIds", None)
-                        operator = getattr(nodes, "operator", None)
-                        audience_data.append(
-                            {
-                                "key_id":key_id,
-                                "value_id":value_id,
-                                "operator":operator,
-                            }
-                        )
-
-        transformed_audience = []
-        if audience_data:
-            for audience in audience_data:
-                key_name = get_key_name(client , audience['key_id'])
-                value_names = get_value_names(client, audience['key_id'], audience['value_id'])
-
-                transformed_audience.append({
-                    'key_name': key_name,
-                    'value_names': value_names,
-                    'operator': audience['operator']
-                })
-
-        daypart_run_dates = []
-
-        daypart_targeting = getattr(targeting, 'dayPartTargeting', None)
-        parsed_day_parts = []
-     
-        if daypart_targeting:
-            day_parts_raw = getattr(daypart_targeting, 'dayParts', [])
-            
-            for dp in day_parts_raw:
-                day_of_week = getattr(dp, 'dayOfWeek', None)
-                start_time = getattr(dp, 'startTime', {})
-                end_time = getattr(dp, 'endTime', {})
-
-                parsed_day_parts.append({
-                    'dayOfWeek': day_of_week,
-                    'startTime': {
-                        'hour': getattr(start_time, 'hour', 0),
-                        'minute': getattr(start_time, 'minute', 'ZERO')
-                    },
-                    'endTime': {
-                        'hour': getattr(end_time, 'hour', 0),
-                        'minute': getattr(end_time, 'minute', 'ZERO')
-                    }
-                })
-      
-        if parsed_day_parts:
-            daypart_run_dates = expand_daypart_to_dates(start_date, end_date, parsed_day_parts)
-        
-        all_line_item_details.append({
-            "name": name,
-            "status": status,
-            "geo": geo if geo else [],
-            "excluded_geo":excluded_geo if excluded_geo else [],
-            "currency_code": currency_code,
-            "total_amt": line_budget,
-            "fcap":fcap,
-            "start_date": start_date,
-            "end_date": end_date,
-            "goal":line_goal,
-            "creative_size":creative_sizes if creative_sizes else [],
-            "priority":priority,    
-            "targetedAdUnits": targeted_ad_units_name if targeted_ad_units_name else [],
-            "excludedAdUnits": excluded_ad_units_name if excluded_ad_units_name else [],
-            "targetedPlacement": targeted_placement_names if targeted_placement_names else [],
-            "audience": transformed_audience if transformed_audience else [],
-            "day_parting_dates":daypart_run_dates if daypart_run_dates else [{"date":"Runs on single day" }],
-            "cpd_daily_rate" : daily_rate_amt,
-            "start_time": line_start_time if line_start_time else "00:00:00",
-            "end_time": end_start_time
-        })
-    
-    return all_line_item_details
-client=ad_manager.AdManagerClient.LoadFromStorage(NEW_GAM)
+        del response, results
+        if parsed:
+            try:
+                yield await resolve_parsed_page_async(gam, parsed, fields)
+            except BaseException:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+
+
+async def get_line_items_details_by_name_async(client, line_item_name: str, fields: Optional[Collection[str]] = None,
+                                               max_in_flight: int = GAM_MAX_IN_FLIGHT) -> List[LineItemRecord]:
+    """Async `get_line_items_details_by_name` with at most `max_in_flight` SOAP requests at a time."""
+    async with GamCaller(client, max_in_flight) as gam:
+        return [details async for page in iter_line_item_pages_async(gam, line_item_name, fields=fields)
+                for details in page]
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_gam_client():
+    """Process-wide AdManagerClient loaded from the NEW_GAM yaml on first use, not at import."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ad_manager.AdManagerClient.LoadFromStorage(NEW_GAM)
+        return _client
+
 #get_line_items_details_by_name(client=ad_manager.AdManagerClient.LoadFromStorage(NEW_GAM), line_item_name="28635260DOMERAYMONTILBOTH1ATFCPDTOIGEORBFULLFY25PAGEPUSHDOWNPKG219849_ppdWAP_LI_ACE")
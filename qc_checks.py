@@ -0,0 +1,331 @@
+"""
+Registry of QC checks between GAM line items and a DSD record.
+
+Every check declares the GAM detail fields and DSD columns it reads. The GAM fetch
+only resolves the sub-resources (ad unit / placement names, custom targeting names,
+daypart expansion) that the active checks ask for, so a CPD run never pays for
+audience lookups it does not compare.
+"""
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+import json
+import math
+
+from utils import parse_date, parse_time
+
+
+def normalize_geo_list(geo_value):
+    """Convert a string or list of geos into a clean list of strings."""
+    if isinstance(geo_value, str):
+        return [g.strip() for g in geo_value.split(",") if g.strip()]
+    elif isinstance(geo_value, (list, tuple)):
+        return [g.strip() if isinstance(g, str) else g for g in geo_value]
+    return []
+
+
+def normalize_list(value):
+    """Ensure value is always a list of stripped strings."""
+    if isinstance(value, str):
+        return [value.strip()]
+    elif isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value]
+    return []
+
+
+def as_number(value) -> Optional[float]:
+    """DSD/GAM numeric cell as a float; blanks, NaN and non-numbers become None."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+    return None if math.isnan(number) else number
+
+
+class MemberList:
+    """
+    A normalized list compared by membership: the list keeps the original order for
+    the output, the frozenset makes each lookup O(1).
+    """
+    __slots__ = ("items", "members")
+
+    def __init__(self, items: List):
+        self.items = items
+        self.members = frozenset(items)
+
+    def missing_from(self, other: "MemberList") -> List:
+        """Items of this list (in order, duplicates kept) that `other` does not contain."""
+        if self.members <= other.members:
+            return []
+        return [v for v in self.items if v not in other.members]
+
+
+def compare_lists(gam: MemberList, dsd: MemberList) -> Tuple[List, List]:
+    """(GAM values missing from the DSD, DSD values missing from GAM), in linear time."""
+    return gam.missing_from(dsd), dsd.missing_from(gam)
+
+
+def scalar_outcome(g_val, d_val) -> Tuple[bool, Dict]:
+    return g_val == d_val, {"gam": g_val, "dsd": d_val}
+
+
+def list_outcome(gam: MemberList, dsd: MemberList) -> Tuple[bool, Dict]:
+    gam_missing, dsd_missing = compare_lists(gam, dsd)
+    if not gam_missing and not dsd_missing:
+        return True, {"gam": gam.items, "dsd": dsd.items}
+    return False, {"gam_missing": gam_missing, "dsd_missing": dsd_missing}
+
+
+class Check:
+    """
+    One named comparison.
+
+    `prepare(dsd_data, options)` builds the DSD side once per run; `compare(g, dsd_side)`
+    returns (matched, entry) for one GAM line item, a `LineItemRecord` read by attribute. `field` is the key the outcome is
+    reported under, so checks from different sets can report the same field.
+    """
+    __slots__ = ("name", "field", "gam_fields", "dsd_fields", "prepare", "compare")
+
+    def __init__(self, name: str, field: str, gam_fields: FrozenSet[str], dsd_fields: FrozenSet[str],
+                 prepare: Callable[[Dict, Dict], Any], compare: Callable[[Dict, Any], Tuple[bool, Dict]]):
+        self.name = name
+        self.field = field
+        self.gam_fields = gam_fields
+        self.dsd_fields = dsd_fields
+        self.prepare = prepare
+        self.compare = compare
+
+
+CHECKS: Dict[str, Check] = {}
+
+
+def _dsd_record(dsd_data, options):
+    return dsd_data
+
+
+def register_check(name: str, gam_fields: Iterable[str], dsd_fields: Iterable[str] = (),
+                   field: str = None, prepare: Callable[[Dict, Dict], Any] = _dsd_record):
+    """Decorator registering `compare(g, dsd_side) -> (matched, entry)` as check `name`."""
+    def decorator(compare):
+        CHECKS[name] = Check(name, field or name, frozenset(gam_fields), frozenset(dsd_fields), prepare, compare)
+        return compare
+    return decorator
+
+
+def get_checks(names: Iterable[str]) -> List[Check]:
+    unknown = [n for n in names if n not in CHECKS]
+    if unknown:
+        raise ValueError(f"Unknown QC checks: {unknown}")
+    return [CHECKS[n] for n in names]
+
+
+def required_gam_fields(checks: Iterable[Check]) -> FrozenSet[str]:
+    """GAM detail fields the checks read; the line item name is always needed for reporting."""
+    fields = {"name"}
+    for check in checks:
+        fields |= check.gam_fields
+    return frozenset(fields)
+
+
+def required_dsd_fields(checks: Iterable[Check]) -> FrozenSet[str]:
+    fields = set()
+    for check in checks:
+        fields |= check.dsd_fields
+    return frozenset(fields)
+
+
+def run_checks(gam_data, dsd_data, checks: List[Check], options: Dict = None) -> Dict:
+    """
+    Run `checks` for every GAM line item against one DSD record.
+
+    Returns {"matched_fields": {...}, "unmatched_fields": {...}}. An unmatched field keeps
+    the outcome of the first line item that failed it plus the names of every line item
+    that failed it, in order.
+    """
+    options = options or {}
+    missing = sorted(f for f in required_dsd_fields(checks) if f not in dsd_data)
+    if missing:
+        print(f"⚠️ DSD has no {missing} column(s), those checks compare against None")
+
+    # The DSD side is the same for every line item, prepare it once
+    prepared = [(check, check.prepare(dsd_data, options)) for check in checks]
+
+    matched, unmatched = {}, {}
+    # field -> names of the line items that did not match, as an ordered set
+    unmatched_line_items: Dict[str, Dict[str, None]] = {}
+    for g in gam_data:
+        g_name = g.name
+        for check, dsd_side in prepared:
+            ok, entry = check.compare(g, dsd_side)
+            if ok:
+                matched[check.field] = entry
+            else:
+                unmatched.setdefault(check.field, {**entry, "unmatch_line_item": []})
+                unmatched_line_items.setdefault(check.field, {})[g_name] = None
+
+    for field, line_item_names in unmatched_line_items.items():
+        unmatched[field]["unmatch_line_item"] = list(line_item_names)
+    return {"matched_fields": matched, "unmatched_fields": unmatched}
+
+
+# ---------------------------------------------------
+# Rate, currency, flight
+# ---------------------------------------------------
+
+@register_check("cpd_daily_rate", gam_fields=["cpd_daily_rate"], dsd_fields=["Rate"])
+def check_cpd_daily_rate(g, dsd_data):
+    return scalar_outcome(g.cpd_daily_rate, dsd_data.get("Rate"))
+
+
+@register_check("cpm_rate", gam_fields=["cpd_daily_rate"], dsd_fields=["Rate"])
+def check_cpm_rate(g, dsd_data):
+    # GAM keeps the CPM in the same costPerUnit field as the CPD daily rate
+    return scalar_outcome(as_number(g.cpd_daily_rate), as_number(dsd_data.get("Rate")))
+
+
+@register_check("currency_code", gam_fields=["currency_code"], dsd_fields=["Currency"])
+def check_currency_code(g, dsd_data):
+    return scalar_outcome(g.currency_code, dsd_data.get("Currency"))
+
+
+# CPD line items run on the single PHB booking date, from midnight to midnight
+@register_check("start_date", gam_fields=["start_date"], dsd_fields=["PHB Booking Date"],
+                prepare=lambda dsd_data, options: parse_date(dsd_data.get("PHB Booking Date")))
+def check_start_date(g, booking_date):
+    return scalar_outcome(parse_date(g.start_date), booking_date)
+
+
+@register_check("end_date", gam_fields=["end_date"], dsd_fields=["PHB Booking Date"],
+                prepare=lambda dsd_data, options: parse_date(dsd_data.get("PHB Booking Date")))
+def check_end_date(g, booking_date):
+    return scalar_outcome(parse_date(g.end_date), booking_date)
+
+
+@register_check("start_time", gam_fields=["start_time"])
+def check_start_time(g, dsd_data):
+    return scalar_outcome(g.start_time, "00:00:00")
+
+
+@register_check("end_time", gam_fields=["end_time"])
+def check_end_time(g, dsd_data):
+    return scalar_outcome(g.end_time, "23:59:59")
+
+
+# CPM line items run over the DSD flight, Start_Date/End_Date carry the times too
+@register_check("flight_start_date", field="start_date", gam_fields=["start_date"], dsd_fields=["Start_Date"],
+                prepare=lambda dsd_data, options: parse_date(dsd_data.get("Start_Date")))
+def check_flight_start_date(g, start_date):
+    return scalar_outcome(parse_date(g.start_date), start_date)
+
+
+@register_check("flight_end_date", field="end_date", gam_fields=["end_date"], dsd_fields=["End_Date"],
+                prepare=lambda dsd_data, options: parse_date(dsd_data.get("End_Date")))
+def check_flight_end_date(g, end_date):
+    return scalar_outcome(parse_date(g.end_date), end_date)
+
+
+@register_check("flight_start_time", field="start_time", gam_fields=["start_time"], dsd_fields=["Start_Date"],
+                prepare=lambda dsd_data, options: parse_time(dsd_data.get("Start_Date")))
+def check_flight_start_time(g, start_time):
+    return scalar_outcome(g.start_time, start_time)
+
+
+@register_check("flight_end_time", field="end_time", gam_fields=["end_time"], dsd_fields=["End_Date"],
+                prepare=lambda dsd_data, options: parse_time(dsd_data.get("End_Date")))
+def check_flight_end_time(g, end_time):
+    return scalar_outcome(g.end_time, end_time)
+
+
+# ---------------------------------------------------
+# Inventory and geo targeting
+# ---------------------------------------------------
+
+def _sheet_placements(dsd_data, options):
+    placements = options.get("dsd_placements")
+    if placements is None:
+        from gamPlacements import get_placement_names
+        placements = get_placement_names()
+    return MemberList(normalize_list(placements))
+
+
+# The expected placements come from the media plan sheet rather than a DSD column
+@register_check("targetedPlacement", gam_fields=["targetedPlacement"], prepare=_sheet_placements)
+def check_targeted_placement(g, dsd_placements):
+    return list_outcome(MemberList(normalize_list(g.targetedPlacement)), dsd_placements)
+
+
+@register_check("included_geo", gam_fields=["geo"], dsd_fields=["Geo_Target"],
+                prepare=lambda dsd_data, options: MemberList(normalize_geo_list(dsd_data.get("Geo_Target"))))
+def check_included_geo(g, dsd_geos):
+    return list_outcome(MemberList(normalize_geo_list(g.geo)), dsd_geos)
+
+
+@register_check("excluded_geo", gam_fields=["excluded_geo"], dsd_fields=["Geo_Exclusion"],
+                prepare=lambda dsd_data, options: MemberList(normalize_geo_list(dsd_data.get("Geo_Exclusion"))))
+def check_excluded_geo(g, dsd_geos):
+    return list_outcome(MemberList(normalize_geo_list(g.excluded_geo)), dsd_geos)
+
+
+# ---------------------------------------------------
+# Delivery settings
+# ---------------------------------------------------
+
+@register_check("fcap", gam_fields=["fcap"], dsd_fields=["Fcap_Imp"])
+def check_fcap(g, dsd_data):
+    return scalar_outcome(as_number(g.fcap), as_number(dsd_data.get("Fcap_Imp")))
+
+
+@register_check("impression_goal", field="goal", gam_fields=["goal"], dsd_fields=["Impr Goal"])
+def check_impression_goal(g, dsd_data):
+    return scalar_outcome(as_number(g.goal), as_number(dsd_data.get("Impr Goal")))
+
+
+def _dsd_audience(dsd_data, options):
+    try:
+        audience = json.loads(dsd_data.get("Audience Required") or "{}")
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(audience, dict):
+        return []
+    return audience.get("audience") or []
+
+
+# The DSD audience spec and GAM key/value names use different vocabularies, so only
+# whether the line item is audience targeted at all is compared.
+@register_check("audience", gam_fields=["audience"], dsd_fields=["Audience Required"], prepare=_dsd_audience)
+def check_audience(g, dsd_audience):
+    gam_audience = [a["key_name"] for a in g.audience]
+    return bool(gam_audience) == bool(dsd_audience), {"gam": gam_audience, "dsd": dsd_audience}
+
+
+def _dsd_day_time(dsd_data, options):
+    value = dsd_data.get("Day Time Targeting")
+    if not isinstance(value, str):
+        return ""
+    return value.strip().strip('"').strip()
+
+
+# Like audience, only whether the line item is dayparted is compared
+@register_check("day_parting", gam_fields=["day_parting_dates"], dsd_fields=["Day Time Targeting"], prepare=_dsd_day_time)
+def check_day_parting(g, dsd_day_time):
+    dates = g.day_parting_dates
+    dayparted = bool(dates) and list(dates) != [{"date": "Runs on single day"}]
+    return dayparted == bool(dsd_day_time), {"gam": dayparted, "dsd": dsd_day_time or None}
+
+
+CHECK_SETS: Dict[str, List[str]] = {
+    "CPD": [
+        "cpd_daily_rate", "currency_code", "start_date", "end_date", "start_time", "end_time",
+        "targetedPlacement", "included_geo", "excluded_geo",
+    ],
+    "CPM": [
+        "cpm_rate", "currency_code", "flight_start_date", "flight_end_date", "flight_start_time",
+        "flight_end_time", "included_geo", "excluded_geo", "fcap", "impression_goal", "audience", "day_parting",
+    ],
+}
+
+
+def checks_for(dsd_data: Dict) -> List[Check]:
+    """The check set for the DSD's Pricing Type; anything but CPM is QC'd as CPD."""
+    pricing_type = str(dsd_data.get("Pricing Type") or "").strip().upper()
+    return get_checks(CHECK_SETS.get(pricing_type, CHECK_SETS["CPD"]))
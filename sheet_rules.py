@@ -0,0 +1,163 @@
+from collections import Counter
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import pandas as pd
+import numpy as np
+import threading
+import yaml
+import os
+import re
+
+load_dotenv()
+SHEET_RULES_PATH = os.getenv("SHEET_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sheet_rules.yaml"))
+SHEET_RULES_CACHE_SIZE = int(os.getenv("SHEET_RULES_CACHE_SIZE", 65536))
+
+
+class Rule:
+    """One compiled normalization rule from sheet_rules.yaml."""
+
+    def __init__(self, spec: Dict):
+        self.name = spec.get("name")
+        if not self.name:
+            raise ValueError(f"Sheet rule without a name: {spec}")
+        columns = spec.get("columns")
+        self.columns = frozenset(columns) if columns else None
+        self.into = None
+        self.default = None
+        self.targets = None
+
+        if "aliases" in spec:
+            self.kind = "aliases"
+            self.targets = list(spec["aliases"])
+            groups = "|".join(
+                f"(?P<alias{i}>{'|'.join(spellings)})" for i, spellings in enumerate(spec["aliases"].values())
+            )
+            self.pattern = re.compile(rf"(?i)\b(?:{groups})\b")
+        elif "extract" in spec:
+            self.kind = "extract"
+            if not spec.get("into"):
+                raise ValueError(f"Sheet rule {self.name}: extract needs an `into` column")
+            self.pattern = re.compile(spec["extract"])
+            self.into = spec["into"]
+            self.default = spec.get("default")
+        elif "pattern" in spec:
+            self.kind = "replace"
+            self.pattern = re.compile(spec["pattern"])
+            self.replacement = spec.get("replacement", "")
+        elif spec.get("strip"):
+            self.kind = "strip"
+            self.pattern = None
+        else:
+            raise ValueError(f"Sheet rule {self.name}: expected one of pattern, aliases, extract or strip")
+
+    def applies_to(self, column) -> bool:
+        return self.columns is None or column in self.columns
+
+    def _alias_target(self, match):
+        for group, spelling in match.groupdict().items():
+            if spelling is not None:
+                return self.targets[int(group[len("alias"):])]
+
+    def apply(self, text: str, extracted: Dict[str, str]) -> Tuple[str, bool]:
+        """Return (new text, whether the rule fired). Extract rules write into `extracted`."""
+        if self.kind == "replace":
+            new_text = self.pattern.sub(self.replacement, text)
+            return new_text, new_text != text
+        if self.kind == "aliases":
+            new_text = self.pattern.sub(self._alias_target, text)
+            return new_text, new_text != text
+        if self.kind == "strip":
+            new_text = text.strip()
+            return new_text, new_text != text
+        match = self.pattern.search(text)
+        extracted[self.into] = match.group(1) if match else self.default
+        return text, match is not None
+
+
+class RuleEngine:
+    """
+    Sheet normalization driven by sheet_rules.yaml.
+
+    Rules are compiled once. Normalizing a cell is memoized per (column, raw value) in an
+    LRU cache, and `apply` only normalizes the distinct values of each column before
+    broadcasting them back to the rows. `stats()` reports how many cells each rule changed
+    (or, for extract rules, matched).
+    """
+
+    def __init__(self, rules: List[Rule], cache_size: int = SHEET_RULES_CACHE_SIZE):
+        self.rules = rules
+        self.fired = Counter()
+        self._lock = threading.Lock()
+        self._normalize = lru_cache(maxsize=cache_size)(self._normalize_uncached)
+
+    @classmethod
+    def from_yaml(cls, path: str = SHEET_RULES_PATH, cache_size: int = SHEET_RULES_CACHE_SIZE) -> "RuleEngine":
+        with open(path, encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        return cls([Rule(spec) for spec in config.get("rules", [])], cache_size=cache_size)
+
+    def _normalize_uncached(self, column, text: str) -> Tuple[str, Tuple[Tuple[str, str], ...], Tuple[str, ...]]:
+        extracted = {}
+        fired = []
+        for rule in self.rules:
+            if rule.applies_to(column):
+                text, did_fire = rule.apply(text, extracted)
+                if did_fire:
+                    fired.append(rule.name)
+        return text, tuple(extracted.items()), tuple(fired)
+
+    def normalize(self, value, column) -> Tuple[str, Dict[str, str]]:
+        """Normalize one cell of `column`: (normalized text, {extracted column: value})."""
+        text, extracted, _ = self._normalize(column, str(value))
+        return text, dict(extracted)
+
+    def apply(self, sheet_df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize every column of `sheet_df`; extracted columns are added (or overwritten) at the end."""
+        out = sheet_df.copy()
+        extracted_columns = {}
+        fired = Counter()
+        for position, column in enumerate(sheet_df.columns):
+            codes, uniques = pd.factorize(sheet_df.iloc[:, position], use_na_sentinel=False)
+            results = [self._normalize(column, str(value)) for value in uniques]
+            out.isetitem(position, np.array([text for text, _, _ in results], dtype=object)[codes])
+
+            rows_per_value = np.bincount(codes, minlength=len(uniques))
+            for (_, _, rule_names), rows in zip(results, rows_per_value):
+                for name in rule_names:
+                    fired[name] += int(rows)
+            for rule in self.rules:
+                if rule.kind == "extract" and rule.applies_to(column):
+                    values = [dict(extracted).get(rule.into) for _, extracted, _ in results]
+                    extracted_columns[rule.into] = np.array(values, dtype=object)[codes]
+
+        for into, values in extracted_columns.items():
+            out[into] = values
+        with self._lock:
+            self.fired.update(fired)
+        return out
+
+    def stats(self) -> Dict:
+        cache = self._normalize.cache_info()
+        with self._lock:
+            fired = dict(self.fired.most_common())
+        return {
+            "rules_fired": fired,
+            "cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize},
+        }
+
+    def cache_clear(self):
+        self._normalize.cache_clear()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Process-wide engine compiled from SHEET_RULES_PATH on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RuleEngine.from_yaml()
+        return _engine
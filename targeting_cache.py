@@ -0,0 +1,117 @@
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Optional, Tuple
+import sqlite3
+import threading
+import time
+import os
+
+load_dotenv()
+TARGETING_CACHE_PATH = os.getenv("TARGETING_CACHE_PATH", os.path.join(".cache", "targeting.sqlite3"))
+# Key and value names almost never change, a week is a safe default
+TARGETING_CACHE_TTL = int(os.getenv("TARGETING_CACHE_TTL", 7 * 24 * 3600))
+
+
+class TargetingCache:
+    """
+    On-disk cache of GAM custom targeting key names and (key_id, value_id) value names.
+
+    Entries older than `ttl` seconds are treated as misses. IDs that GAM does not
+    know are stored with a None name so they are not looked up again until they
+    expire. The cache only stores names; fetching misses from GAM is left to the
+    caller so misses can be looked up in bulk.
+    """
+
+    def __init__(self, path: str = TARGETING_CACHE_PATH, ttl: int = TARGETING_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS targeting_keys (
+                key_id INTEGER PRIMARY KEY,
+                name TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS targeting_values (
+                key_id INTEGER NOT NULL,
+                value_id INTEGER NOT NULL,
+                name TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (key_id, value_id)
+            );
+            """
+        )
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl
+
+    def get_keys(self, key_ids: Iterable[int]) -> Tuple[Dict[int, Optional[str]], List[int]]:
+        """Return ({key_id: name or None} for fresh entries, [key_ids that missed])."""
+        wanted = list(dict.fromkeys(int(k) for k in key_ids if k is not None))
+        found = {}
+        with self._lock:
+            for k in wanted:
+                row = self._conn.execute(
+                    "SELECT name FROM targeting_keys WHERE key_id = ? AND fetched_at >= ?",
+                    (k, self._fresh_after()),
+                ).fetchone()
+                if row:
+                    found[k] = row[0]
+            missing = [k for k in wanted if k not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def get_values(self, pairs: Iterable[Tuple[int, int]]) -> Tuple[Dict[Tuple[int, int], Optional[str]], List[Tuple[int, int]]]:
+        """Return ({(key_id, value_id): name or None} for fresh entries, [(key_id, value_id) pairs that missed])."""
+        wanted = list(dict.fromkeys((int(k), int(v)) for k, v in pairs))
+        found = {}
+        with self._lock:
+            for k, v in wanted:
+                row = self._conn.execute(
+                    "SELECT name FROM targeting_values WHERE key_id = ? AND value_id = ? AND fetched_at >= ?",
+                    (k, v, self._fresh_after()),
+                ).fetchone()
+                if row:
+                    found[(k, v)] = row[0]
+            missing = [p for p in wanted if p not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put_keys(self, names: Dict[int, Optional[str]]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO targeting_keys (key_id, name, fetched_at) VALUES (?, ?, ?)",
+                [(int(k), name, now) for k, name in names.items()],
+            )
+
+    def put_values(self, names: Dict[Tuple[int, int], Optional[str]]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO targeting_values (key_id, value_id, name, fetched_at) VALUES (?, ?, ?, ?)",
+                [(int(k), int(v), name, now) for (k, v), name in names.items()],
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_targeting_cache() -> TargetingCache:
+    """Process-wide cache at TARGETING_CACHE_PATH, opened on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TargetingCache()
+        return _default_cache
@@ -0,0 +1,69 @@
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DSD import parser
+
+
+def dsd_frame() -> pd.DataFrame:
+    """A DSD-like frame with the cell and label types read_excel produces."""
+    return pd.DataFrame({
+        "Order Name": ["Order A", "Order A", "Order A"],
+        "Rate": [150, "TBD", 12.5],
+        2025: ["x", 3, np.nan],
+        datetime(2025, 11, 28): [True, "yes", date(2025, 12, 1)],
+        "Start": [pd.Timestamp("2025-12-01 06:00"), datetime(2025, 12, 2, 7, 30), time(23, 59)],
+        "Goal": [1000.0, 2000.0, np.nan],
+        7: [1, 2, 3],
+        "Line Item Name": ["123456_a, 123456_b", "123456_c", np.nan],
+    })
+
+
+@pytest.fixture
+def report(tmp_path, monkeypatch):
+    path = tmp_path / "DSD_REPORT.xls"
+    path.write_bytes(b"report contents")
+    monkeypatch.setattr(parser, "read_any", lambda _: dsd_frame())
+    return str(path)
+
+
+def assert_same_cells(actual: pd.DataFrame, expected: pd.DataFrame):
+    assert list(actual.columns) == list(expected.columns)
+    assert [type(label) for label in actual.columns] == [type(label) for label in expected.columns]
+    for column in expected.columns:
+        for got, want in zip(actual[column], expected[column]):
+            if pd.isna(want):
+                assert pd.isna(got)
+            else:
+                assert got == want and type(got) is type(want), (column, got, want)
+
+
+def test_sidecar_round_trip_keeps_cell_and_label_types(report):
+    df, keys = parser.read_report_frame(report)
+    assert keys == [["123456_a", "123456_b"], ["123456_c"], []]
+
+    cached = parser.read_sidecar(report, parser.file_sha256(report))
+    assert cached is not None
+    cached_df, cached_keys = cached
+    assert cached_keys == keys
+    assert_same_cells(cached_df, df)
+
+
+def test_sidecar_is_rebuilt_for_changed_source(report):
+    parser.read_report_frame(report)
+    assert parser.read_sidecar(report, "another hash") is None
+
+
+def test_failed_sidecar_write_still_returns_the_report(report, monkeypatch, caplog):
+    def broken_write(*args):
+        raise TypeError("keywords must be strings")
+    monkeypatch.setattr(parser, "write_sidecar", broken_write)
+
+    df, keys = parser.read_report_frame(report)
+
+    assert_same_cells(df, dsd_frame())
+    assert keys == [["123456_a", "123456_b"], ["123456_c"], []]
+    assert parser.read_sidecar(report, parser.file_sha256(report)) is None
+    assert "Could not write DSD sidecar" in caplog.text
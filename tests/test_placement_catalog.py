@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from gamPlacements import Base, Placement, PlacementCatalog, ilike_pattern
+
+# (website, platform, ad_unit_type, placement, section, placement_name)
+PLACEMENTS = [
+    ("Times Of India", "WEB", "MREC", "ATF", "Home", "toi_home_mrec_atf"),
+    ("times of india", "web", "mrec", "atf", "home", "toi_lowercase_section"),
+    ("TOI", "WEB", "TOP_BANNER", "ATF", "Home", "top_underscore_banner"),
+    ("TOI", "WEB", "TOP-BANNER", "ATF", "Home", "top_dash_banner"),
+    ("TOI", "WEB", "TOPBANNER", "ATF", "Home", "topbanner"),
+    ("TOI", "WEB", "MREC", "50% OFF", "Home", "fifty_percent_off"),
+    ("TOI", "WEB", "MREC", "50X OFF", "Home", "fifty_x_off"),
+    ("TOI", "WEB", "MREC", "Mid", "News", "news_mid"),
+]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(
+        Placement(website=website, platform=platform, ad_unit_type=ad_unit_type, placement=placement,
+                  section=section, geo="IN", placement_name=name)
+        for website, platform, ad_unit_type, placement, section, name in PLACEMENTS
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def catalog(session):
+    return PlacementCatalog(session)
+
+
+@pytest.mark.parametrize("pattern, value, matches", [
+    ("TOP%", "Top Banner", True),
+    ("TOP%", "Mid Top", False),
+    ("%", "", True),
+    ("TOP_BANNER", "top banner", True),
+    ("TOP_BANNER", "TOPBANNER", False),
+    ("50\\% OFF", "50% off", True),
+    ("50\\% OFF", "50X OFF", False),
+    ("A\\_B", "a_b", True),
+    ("A\\_B", "AXB", False),
+    ("Times Of India", "TIMES OF INDIA", True),
+    ("a.b", "axb", False),
+])
+def test_ilike_pattern_matches_like_postgres(pattern, value, matches):
+    assert bool(ilike_pattern(pattern).fullmatch(value)) is matches
+
+
+def test_lookup_ignores_case_of_key_fields(catalog):
+    assert catalog.lookup("TIMES OF INDIA", "Web", "Mrec", "atf", ["Home"]) == ["toi_home_mrec_atf"]
+
+
+def test_lookup_matches_section_exactly(catalog):
+    assert catalog.lookup("Times Of India", "WEB", "MREC", "ATF", ["home"]) == ["toi_lowercase_section"]
+    assert catalog.lookup("Times Of India", "WEB", "MREC", "ATF", ["HOME"]) == []
+
+
+def test_lookup_underscore_matches_one_character(catalog):
+    assert catalog.lookup("TOI", "WEB", "TOP_BANNER", "ATF", ["Home"]) == [
+        "top_underscore_banner", "top_dash_banner",
+    ]
+
+
+def test_lookup_percent_matches_any_run(catalog):
+    assert catalog.lookup("TOI", "WEB", "TOP%", "ATF", ["Home"]) == [
+        "top_underscore_banner", "top_dash_banner", "topbanner",
+    ]
+    assert catalog.lookup("toi", "web", "mrec", "50%", ["Home"]) == ["fifty_percent_off", "fifty_x_off"]
+
+
+def test_lookup_escaped_percent_is_literal(catalog):
+    assert catalog.lookup("TOI", "WEB", "MREC", "50\\% OFF", ["Home"]) == ["fifty_percent_off"]
+
+
+def test_lookup_over_several_sections_keeps_table_order(catalog):
+    assert catalog.lookup("TOI", "WEB", "MREC", "%", ["News", "Home", "News"]) == [
+        "fifty_percent_off", "fifty_x_off", "news_mid",
+    ]
+
+
+def test_refresh_picks_up_new_rows_for_memoized_wildcards(catalog, session):
+    assert catalog.lookup("TOI", "WEB", "MREC", "%", ["News"]) == ["news_mid"]
+    session.add(Placement(website="TOI", platform="WEB", ad_unit_type="MREC", placement="BTF",
+                          section="News", geo="IN", placement_name="news_btf"))
+    session.commit()
+
+    assert catalog.refresh() == 1
+    assert catalog.lookup("TOI", "WEB", "MREC", "%", ["News"]) == ["news_mid", "news_btf"]
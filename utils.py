@@ -1,8 +1,51 @@
 from dateutil import parser
 from dateutil.tz import gettz  #  correct import for timezones
 from datetime import datetime, date
+from functools import lru_cache
+from typing import Optional
+import pandas as pd
+import numpy as np
+import re
 
 
+# Handle strings with possible timezones like GMT
+TZINFOS = {"GMT": gettz("GMT")}
+ISO_DATE_PREFIX = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Formats seen in DSD exports and GAM dumps. Only year-first or month-name formats, which
+# dateutil reads the same way, so the fast path never disagrees with the fallback.
+KNOWN_FORMATS = (
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%d-%b-%Y %H:%M:%S",
+    "%b %d, %Y",
+)
+PARSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_datetime(text: str) -> Optional[datetime]:
+    """
+    Parse one date/datetime string: ISO first, then the known strptime formats, and
+    fuzzy dateutil only for anything else. Memoized per raw string.
+    """
+    if ISO_DATE_PREFIX.match(text):
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in KNOWN_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    try:
+        return parser.parse(text, tzinfos=TZINFOS, fuzzy=True)
+    except Exception as e:
+        print(f"Failed to parse date: {text}\nError: {e}")
+        return None
+
 
 def parse_date(date_input):
     if not date_input:
@@ -12,12 +55,33 @@ def parse_date(date_input):
     if isinstance(date_input, (datetime, date)):
         return date_input.strftime("%Y-%m-%d")
 
-    try:
-        # Handle strings (with possible timezones like GMT)
-        tzinfos = {"GMT": gettz("GMT")}  # ✅ correct usage
-        parsed = parser.parse(str(date_input).strip(), tzinfos=tzinfos, fuzzy=True)
-        return parsed.strftime("%Y-%m-%d")
-    except Exception as e:
-        print(f"Failed to parse date: {date_input}\nError: {e}")
+    parsed = _parse_datetime(str(date_input).strip())
+    return parsed.strftime("%Y-%m-%d") if parsed else None
+
+
+def parse_time(date_input):
+    """Time of day (HH:MM:SS) of a datetime value such as the DSD's '2025/11/27 00:00:00'."""
+    if not date_input:
         return None
 
+    if isinstance(date_input, datetime):
+        return date_input.strftime("%H:%M:%S")
+
+    parsed = _parse_datetime(str(date_input).strip())
+    return parsed.strftime("%H:%M:%S") if parsed else None
+
+
+def parse_date_series(values: pd.Series) -> pd.Series:
+    """
+    `parse_date` over a whole column: YYYY-MM-DD strings, None where a value is empty or
+    unparseable. Datetime columns are formatted directly; other columns are parsed once
+    per distinct value and broadcast back to the rows.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        formatted = values.dt.strftime("%Y-%m-%d")
+        return formatted.astype(object).where(formatted.notna(), None)
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = np.array([parse_date(v) for v in uniques] + [None], dtype=object)
+    # NA rows have code -1, which picks the trailing None
+    return pd.Series(parsed[codes], index=values.index, name=values.name, dtype=object)